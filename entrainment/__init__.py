@@ -1,18 +1,26 @@
 r"""Main {entrainment} package."""
 from . import data
 from .run_model import run_model
-from .analyze_model import analyze_model
-from .test_hypothesis import test_hypothesis
+from .run_model_sweep import run_model_sweep
+from .run_model_grid import run_model_grid
+from .model_result import ModelResult, load_model, save_model
+from .analyze_model import analyze_model, analyze_model_batch
+from .test_hypothesis import test_hypothesis, test_hypothesis_batch
 from .plot_model import plot_model_line, plot_model_line_1_2
 from .plot_model import plot_model_violin, plot_model_violin_1_2
 from .plot_model import plot_model_dynamics
 from .get_labren_data import get_labren_data, plot_labren_data
+from .get_labren_data import build_labren_data, clear_labren_cache
+from .save_figures import save_figures
 
 __all__ = [
-    "data", "run_model", "analyze_model", "test_hypothesis", 
-    "plot_model_line", "plot_model_line_1_2", "plot_model_violin",
-    "plot_model_violin_1_2", "plot_model_dynamics",
-    "get_labren_data", "plot_labren_data"
+    "data", "run_model", "run_model_sweep", "run_model_grid", "ModelResult",
+    "save_model", "load_model",
+    "analyze_model", "analyze_model_batch", "test_hypothesis",
+    "test_hypothesis_batch", "plot_model_line", "plot_model_line_1_2",
+    "plot_model_violin", "plot_model_violin_1_2", "plot_model_dynamics",
+    "get_labren_data", "plot_labren_data", "build_labren_data",
+    "clear_labren_cache", "save_figures"
     ]
 
 __version__ = "0.0.0.9000"
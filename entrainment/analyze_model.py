@@ -1,32 +1,224 @@
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 import scipy
 import seaborn as sns
 import statsmodels.api as sm
 from box import Box
 from collections import namedtuple
 from scipy import stats
+from .utils import get_figure, show_figure
+
+normality_tests = {
+    "shapiro": "Shapiro-Wilk", "subsample": "Shapiro-Wilk (subsample)",
+    "dagostino": "D'Agostino-Pearson"
+    }
+
+## Same fields as the results of ``stats.kstest()`` and ``stats.shapiro()``
+KstestResult = namedtuple("KstestResult", ["statistic", "pvalue"])
+ShapiroResult = namedtuple("ShapiroResult", ["statistic", "pvalue"])
 
 def analyze_model(
-    model, exposure, param = "tau", name = None, print_stats = True, plot = True
+    model, exposure, param = "tau", name = None, print_stats = True, plot = True,
+    normality = "auto"
     ):
-    """Compute and plot model statistics."""
-    data = [i[param] for i in np.array(model.turtles[exposure])]
+    """Compute and plot model statistics.
+    
+    The statistics are taken from ``analyze_model_batch()``, which computes 
+    them for all exposures at once and caches them on ``model``. See 
+    ``analyze_model_batch()`` for the ``normality`` tests. For models read 
+    lazily by ``load_model()``, only the ``exposure`` values are read (and 
+    analyzed).
+    
+    ``kstest`` and ``normality`` hold the ``statistic`` and ``pvalue`` of the
+    tests (``normality`` also holds its ``test``). When Shapiro-Wilk is used,
+    its result is also kept in ``shapiro``, as in previous versions.
+    """
+    if param == "tau" and not model.loaded:
+        data = model.tau(exposure)
+        key = ("analyze_model", model.index(exposure), normality)
+        row = model.memoize(key, lambda model: describe_rows(
+            data[np.newaxis], normality = normality
+            ).iloc[0])
+    elif param == "tau":
+        table = analyze_model_batch(model, normality = normality)
+        data = model.tau(exposure)
+        row = table.iloc[model.index(exposure)]
+    else:
+        table = analyze_model_batch(model, param = "k", normality = normality)
+        data = model.k
+        row = table.iloc[0]
     
     out = Box(
-        mean = np.mean(data), var = np.var(data), std = np.std(data), 
-        min = np.quantile(data, 0), q_1 = np.quantile(data, 0.25), 
-        median = np.quantile(data, 0.5), q_3 = np.quantile(data, 0.75), 
-        max = np.quantile(data, 1), kurtosis = stats.kurtosis(data),
-        skew = stats.skew(data), kstest = stats.kstest(data, stats.norm.cdf), 
-        shapiro = stats.shapiro(data)
+        mean = row["mean"], var = row["var"], std = row["std"], 
+        min = row["min"], q_1 = row["q_1"], median = row["median"], 
+        q_3 = row["q_3"], max = row["max"], kurtosis = row["kurtosis"],
+        skew = row["skew"], 
+        kstest = KstestResult(row["ks_stat"], row["ks_pvalue"]),
+        normality = Box(
+            test = row["normality_test"], statistic = row["normality_stat"], 
+            pvalue = row["normality_pvalue"]
+            )
         )
     
+    if row["normality_test"] in ["shapiro", "subsample"]:
+        out.shapiro = ShapiroResult(
+            row["normality_stat"], row["normality_pvalue"]
+            )
+    
     if print_stats == True: print_model_analysis(out, exposure, name)
-    if plot == True: plot_model_analysis(data, exposure, name)
+    
+    if plot == True: 
+        plot_model_analysis(data, exposure, name, model_stats = out)
     
     return out
 
+def analyze_model_batch(model, param = "tau", normality = "auto"):
+    """Compute model statistics for all exposures at once.
+    
+    Returns a tidy ``pandas.DataFrame`` with one row for each model step 
+    (``cycle`` and ``exposure``), in the order of ``model.steps``, holding 
+    the same statistics as ``analyze_model()``. With ``param = "k"``, it has 
+    a single row, for the ``k`` values.
+    
+    The statistics are computed from the whole ``(steps, n)`` matrix, 
+    sorting each row once. The table is cached on ``model``, so later calls
+    (including the ones made by ``analyze_model()`` and 
+    ``test_hypothesis()``) are free.
+    
+    ``normality`` sets the normality test: ``"shapiro"`` (Shapiro-Wilk), 
+    ``"subsample"`` (Shapiro-Wilk on a random subsample of 5000 values) or 
+    ``"dagostino"`` (D'Agostino-Pearson's K², computed from the skewness and
+    kurtosis, at no extra cost). Shapiro-Wilk p-values are not reliable above
+    5000 values, so ``"auto"`` uses ``"shapiro"`` up to 5000 turtles/subjects
+    and ``"dagostino"`` above that.
+    
+    :Example:
+    
+    >>> model = entrainment.run_model(plot = False)
+    >>> entrainment.analyze_model_batch(model)
+    """
+    if not param in ["tau", "k"]:
+        raise ValueError("'param' must be \"tau\" or \"k\".")
+    
+    key = ("analyze_model_batch", param, normality)
+    
+    return model.memoize(key, lambda model: (
+        describe_rows(model.tau(), model.steps, normality) if param == "tau" 
+        else describe_rows(model.k[np.newaxis], normality = normality)
+        ))
+
+def describe_rows(data, steps = None, normality = "auto"):
+    """Compute the statistics of ``analyze_model()`` for each row of ``data``.
+    
+    ``steps`` can hold the ``(cycle, label)`` pair of each row. See 
+    ``analyze_model_batch()`` for the ``normality`` tests.
+    """
+    data = np.sort(data, axis = 1)
+    n = data.shape[1]
+    
+    if normality == "auto": normality = "shapiro" if n <= 5000 else "dagostino"
+    
+    if not normality in ["shapiro", "subsample", "dagostino"]:
+        raise ValueError(
+            "'normality' must be \"auto\", \"shapiro\", \"subsample\" or " +
+            "\"dagostino\"."
+            )
+    
+    ## Quantiles read from the sorted rows (linear interpolation, as 
+    ## ``np.quantile()``)
+    position = np.array([0, 0.25, 0.5, 0.75, 1]) * (n - 1)
+    left = np.floor(position).astype(int)
+    right = np.minimum(left + 1, n - 1)
+    weight = position - left
+    quantiles = (data[:, left] * (1 - weight) + data[:, right] * weight).T
+    
+    ## Kolmogorov-Smirnov test against the standard normal distribution, as 
+    ## ``stats.kstest()`` does (exact p-values), using the sorted rows
+    cdf = stats.norm.cdf(data)
+    ks_stat = np.maximum(
+        np.max(np.arange(1, n + 1) / n - cdf, axis = 1),
+        np.max(cdf - np.arange(0, n) / n, axis = 1)
+        )
+    ks_pvalue = stats.kstwo.sf(ks_stat, n)
+    kurtosis = stats.kurtosis(data, axis = 1)
+    skew = stats.skew(data, axis = 1)
+    
+    if normality == "dagostino":
+        normality_test = dagostino_test(skew, kurtosis, n)
+    else:
+        if normality == "subsample" and n > 5000:
+            rng = np.random.default_rng(0)
+            sample = [rng.choice(i, 5000, replace = False) for i in data]
+        else:
+            sample = data
+        
+        normality_test = np.array([tuple(stats.shapiro(i)) for i in sample]).T
+    
+    out = pd.DataFrame({
+        "mean": np.mean(data, axis = 1), "var": np.var(data, axis = 1),
+        "std": np.std(data, axis = 1), "min": quantiles[0], 
+        "q_1": quantiles[1], "median": quantiles[2], "q_3": quantiles[3],
+        "max": quantiles[4], "kurtosis": kurtosis, "skew": skew, 
+        "ks_stat": ks_stat, "ks_pvalue": np.clip(ks_pvalue, 0, 1), 
+        "normality_test": normality, "normality_stat": normality_test[0],
+        "normality_pvalue": normality_test[1]
+        })
+    
+    if not steps is None:
+        out.insert(0, "cycle", [i[0] for i in steps])
+        out.insert(1, "exposure", [i[1] for i in steps])
+    
+    return out
+
+def dagostino_test(skew, kurtosis, n):
+    """Compute D'Agostino-Pearson's K² normality test from sample moments.
+    
+    ``skew`` and ``kurtosis`` (Fisher's definition) are the (biased) sample 
+    skewness and kurtosis of samples of size ``n``, as returned by 
+    ``stats.skew()`` and ``stats.kurtosis()``. This gives the same results as
+    ``stats.normaltest()``, without another pass over the data. Returns the 
+    ``(statistic, pvalue)`` arrays.
+    
+    References
+    ==========
+    
+    D'Agostino, R. B., & Pearson, E. S. (1973). Tests for departure from 
+    normality. Empirical results for the distributions of b2 and √b1. 
+    Biometrika, 60(3), 613-622. https://doi.org/10.1093/biomet/60.3.613
+    """
+    skew, b_2 = np.asarray(skew), np.asarray(kurtosis) + 3
+    
+    ## Skewness test (see ``stats.skewtest()``)
+    y = skew * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+    beta_2 = (3.0 * (n**2 + 27 * n - 70) * (n + 1) * (n + 3)) / \
+        ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+    w_2 = -1 + np.sqrt(2 * (beta_2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w_2))
+    alpha = np.sqrt(2.0 / (w_2 - 1))
+    y = np.where(y == 0, 1, y)
+    z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha)**2 + 1))
+    
+    ## Kurtosis test (see ``stats.kurtosistest()``)
+    e = 3.0 * (n - 1) / (n + 1)
+    var_b_2 = 24.0 * n * (n - 2) * (n - 3) / \
+        ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    x = (b_2 - e) / np.sqrt(var_b_2)
+    sqrt_beta_1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * \
+        np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3)))
+    a = 6.0 + 8.0 / sqrt_beta_1 * \
+        (2.0 / sqrt_beta_1 + np.sqrt(1 + 4.0 / (sqrt_beta_1**2)))
+    term_1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    term_2 = np.sign(denom) * np.where(
+        denom == 0.0, np.nan, ((1 - 2.0 / a) / np.abs(denom))**(1 / 3.0)
+        )
+    z_kurtosis = (term_1 - term_2) / np.sqrt(2 / (9.0 * a))
+    
+    statistic = z_skew**2 + z_kurtosis**2
+    
+    return statistic, stats.chi2.sf(statistic, 2)
+
 def print_model_analysis(stats, exposure, name = None):
     line = "---------------------------------------------------------"
     
@@ -38,13 +230,14 @@ def print_model_analysis(stats, exposure, name = None):
                "3rd Qu. = {q_3}\nMax. = {max}\n\n" +\
                "Kurtosis = {kurtosis}\nSkewness = {skew}\n\n" +\
                "Kolmogorov-Smirnov test p-value = {kstest}\n" +\
-               "Shapiro-Wilks test p-value = {shapiro}")\
+               "Normality test ({test}) p-value = {normality}")\
                .format(
                    mean = stats.mean, var = stats.var, std = stats.std,
                    min = stats.min, q_1 = stats.q_1, median = stats.median,
                    q_3 = stats.q_3, max = stats.max, kurtosis = stats.kurtosis,
                    skew = stats.skew, kstest = stats.kstest.pvalue,
-                   shapiro = stats.shapiro.pvalue
+                   test = normality_tests[stats.normality.test],
+                   normality = stats.normality.pvalue
                    )
     
     print(line, title, summary, line, sep = "\n\n")
@@ -52,21 +245,39 @@ def print_model_analysis(stats, exposure, name = None):
     return None
 
 def plot_model_analysis(
-    data, exposure, name = None, dist = scipy.stats.distributions.norm
+    data, exposure, name = None, dist = scipy.stats.distributions.norm,
+    model_stats = None, ax = None, fig = None, show = True
     ):
+    """Plot the distribution of a model exposure and its Q-Q plot.
+    
+    See ``plot_model_line()`` for ``ax`` (here, a pair of axes), ``fig`` and
+    ``show``.
+    """
+    if model_stats == None:
+        model_stats = describe_rows(np.atleast_2d(data)).iloc[0]
+        model_stats = Box(
+            mean = model_stats["mean"], 
+            kstest = Box(pvalue = model_stats["ks_pvalue"]),
+            normality = Box(
+                test = model_stats["normality_test"], 
+                pvalue = model_stats["normality_pvalue"]
+                )
+            )
+    
     title = ("Group = {name}, Exposure = {exposure}, Mean = ${mean}$, " +\
-             "KS = ${kstest}$, Shapiro-Wilk = ${shapiro}$")\
+             "KS = ${kstest}$, {test} = ${normality}$")\
              .format(
                  name = name, exposure = exposure.title(), 
-                 mean = round(np.mean(data), 3),
-                 kstest = round(stats.kstest(data, stats.norm.cdf).pvalue, 3),
-                 shapiro = round(stats.shapiro(data).pvalue, 3)
+                 mean = round(model_stats.mean, 3),
+                 kstest = round(model_stats.kstest.pvalue, 3),
+                 test = normality_tests[model_stats.normality.test],
+                 normality = round(model_stats.normality.pvalue, 3)
                  )
     
     plt.rcParams.update({'font.size': 8})
-    plt.clf()
     
-    fig, [ax_x, ax_y] = plt.subplots(nrows = 1, ncols = 2)
+    adjust = ax is None
+    fig, [ax_x, ax_y] = get_figure(fig, ax, nrows = 1, ncols = 2)
     
     ax_x.hist(data, density = True, edgecolor = "white", color = "#bcbcbc")
     sns.kdeplot(
@@ -84,12 +295,12 @@ def plot_model_analysis(
     ax_y.set_ylabel("Sample quantiles ($\\tau$)")
     ax_y.set_xlim(-3.5, 3.5)
     
-    plt.suptitle(title, fontsize = 8, y = 0.9375)
+    fig.suptitle(title, fontsize = 8, y = 0.9375)
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.10625, bottom = 0.1625, right = 0.95, top = 0.875,
-        wspace = 0.4, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.10625, bottom = 0.1625, right = 0.95, top = 0.875,
+            wspace = 0.4, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
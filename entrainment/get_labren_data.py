@@ -1,8 +1,9 @@
+import functools
 import matplotlib.ticker as ticker
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from .utils import reorder
+from .utils import get_figure, reorder, show_figure
 from box import Box
 from importlib.resources import files
 from scipy.interpolate import make_interp_spline
@@ -12,6 +13,13 @@ global_horizontal_means = (
     .joinpath("global_horizontal_means.csv")
     )
 
+global_horizontal_means_npy = (
+    files("entrainment.data")
+    .joinpath("global_horizontal_means.npy")
+    )
+
+labren_seasons = ("summer", "autumn", "winter", "spring")
+
 def get_labren_data(id, by = "month", name = None):
     """Retrieve LABREN's global horizontal solar irradiation.
     
@@ -29,63 +37,126 @@ def get_labren_data(id, by = "month", name = None):
         id = 1, by = "year", name = "Arroio Chuí (Lat.: - 33.752)"
         )
     """
-    data = (
-        pd.read_csv(filepath_or_buffer = global_horizontal_means, sep = ";")
-        .rename(str.lower, axis = "columns")
-        .loc[[id - 1]]
-    )
+    data = load_labren_data()
+    row = data[get_labren_index(id)]
     
     out = Box({"name": name})
-    for i in list(data): out[i] = data.loc[id - 1, i]
+    for i in ["id", "country", "lon", "lat", "annual"]: out[i] = row[i].item()
     
+    if by == "season":
+        for i in labren_seasons: out[i] = row[i].item()
+        out["ts"] = [row[i].item() for i in labren_seasons]
+    elif by == "year":
+        out["ts"] = out["annual"]
+    else:
+        for i in labren_months(data): out[i] = row[i].item()
+        out["ts"] = [row[i].item() for i in labren_months(data)]
+    
+    return Box(out, frozen_box = True)
+
+@functools.lru_cache(maxsize = None)
+def load_labren_data():
+    """Load LABREN's global horizontal solar irradiation table.
+    
+    The table is a NumPy structured array (one record per station, sorted by 
+    id), with the seasonal means precomputed. If the binary file created by 
+    ``build_labren_data()`` exists, it is memory-mapped, so only the records
+    that are actually used are read from disk. Otherwise, the CSV file is 
+    parsed.
+    
+    The table is loaded only once per process. Later calls return the cached 
+    table. Use ``clear_labren_cache()`` to force a reload.
+    """
+    if global_horizontal_means_npy.is_file():
+        return np.load(str(global_horizontal_means_npy), mmap_mode = "r")
+    else:
+        return read_labren_csv()
+
+def read_labren_csv(file = global_horizontal_means):
+    """Parse LABREN's CSV file into a NumPy structured array."""
     data = (
-        data.iloc[:, 5:17]
-        .transpose()
+        pd.read_csv(filepath_or_buffer = file, sep = ";")
+        .rename(str.lower, axis = "columns")
+        .sort_values("id")
     )
+    
+    months = list(data.columns[5:17])
+    seasons = [
+        ["dec", "jan", "feb"], ["mar", "apr", "may"], ["jun", "jul", "aug"], 
+        ["sep", "oct", "nov"]
+        ]
+    
+    for i, j in zip(labren_seasons, seasons): 
+        data[i] = data.loc[:, j].mean(axis = 1)
+    
+    columns = list(data.columns[0:5]) + months + list(labren_seasons)
+    dtype = []
+    
+    for i in columns:
+        if pd.api.types.is_numeric_dtype(data[i]):
+            dtype.append((i, data[i].to_numpy().dtype))
+        else:
+            dtype.append((i, "U" + str(data[i].astype(str).str.len().max())))
+    
+    out = np.empty(len(data), dtype = dtype)
+    for i in columns: out[i] = data[i].to_numpy(dtype = out.dtype[i])
+    
+    return out
 
-    data.reset_index(inplace = True)
-    data.columns = ["month", "x"]
+def build_labren_data(file = global_horizontal_means, path = None):
+    """Build the binary version of LABREN's table.
     
-    out["ts"] = list(data["x"])
+    Parses the CSV ``file`` once and saves it as a ``.npy`` structured array 
+    (by default, next to the CSV file in the ``entrainment.data`` package), 
+    which ``load_labren_data()`` memory-maps in later sessions and worker 
+    processes.
     
-    if by == "season":
-        seasons = [
-            ["Dec", "Jan", "Feb"], ["Mar", "Apr", "May"], ["Jun", "Jul", "Aug"], 
-            ["Sep", "Oct", "Nov"]
-            ]
-        
-        keys = ["name", "id", "country", "lon", "lat", "annual"]
-        labels = ["Summer", "Autumn", "Winter", "Spring"]
-        data = out
-        out = {}
-    
-        for i, j in enumerate(data):
-            if j in keys: out[j] = data[j]
-        
-        for i in range(4):
-            mean = np.mean([data[i.lower()] for i in seasons[i]])
-            out[labels[i].lower()] = mean
-        
-        out["ts"] = [out[i.lower()] for i in labels]
-    
-    if by == "year":
-        keys = ["name", "id", "country", "lon", "lat", "annual"]
-        data = out
-        out = {}
-        
-        for i, j in enumerate(data):
-            if j in keys: out[j] = data[j]
-        
-        out["ts"] = out["annual"]
+    :Example:
     
-    return Box(out, frozen_box = True)
+    >>> entrainment.build_labren_data()
+    """
+    if path == None: path = global_horizontal_means_npy
+    
+    np.save(str(path), read_labren_csv(file))
+    clear_labren_cache()
+    
+    return None
+
+def get_labren_index(id):
+    """Get the record index of a LABREN station id in the LABREN table.
+    
+    Ids are usually contiguous, which allows a direct lookup. Otherwise, a 
+    binary search on the (sorted) ids is used.
+    """
+    ids = load_labren_data()["id"]
+    i = id - ids[0]
+    
+    if not ((0 <= i < len(ids)) and (ids[i] == id)):
+        i = np.searchsorted(ids, id)
+    
+    if not ((0 <= i < len(ids)) and (ids[i] == id)):
+        raise KeyError("LABREN id {id} was not found.".format(id = id))
+    
+    return int(i)
+
+def labren_months(data):
+    """Get the month field names of the LABREN table."""
+    return data.dtype.names[5:17]
+
+def clear_labren_cache():
+    """Clear the cached LABREN table loaded by ``load_labren_data()``."""
+    load_labren_data.cache_clear()
+    
+    return None
 
 def plot_labren_data(
     id_1 = 72272, id_2 = 1, by = "month", start_at = 0, label_1 = None, 
-    label_2 = None
+    label_2 = None, ax = None, fig = None, show = True
     ):
     """Plot and compare LABREN's global horizontal solar irradiation.
     
+    See ``plot_model_line()`` for ``ax``, ``fig`` and ``show``.
+    
     :Example:
     
     >>> entrainment.plot_labren_data(
@@ -124,8 +195,8 @@ def plot_labren_data(
     title = "Global Horizontal Solar Irradiation (Source: LABREN/INPE, 2017)"
     
     plt.rcParams.update({'font.size': 10})
-    plt.clf()
-    fig, ax = plt.subplots()
+    adjust = ax is None
+    fig, ax = get_figure(fig, ax)
     
     labels_0, y_1_0, y_2_0 = tuple(labels), tuple(y_1), tuple(y_2)
     labels.extend(labels_0)
@@ -153,12 +224,12 @@ def plot_labren_data(
     ax.set_ylabel("$Wh / m^{2}.day$")
     ax.set_title(title, fontsize = 10)
     
-    plt.legend(fontsize = 8)
+    ax.legend(fontsize = 8)
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.15, bottom = 0.16875, right = 0.95, top = 0.8875, 
-        wspace = None, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.15, bottom = 0.16875, right = 0.95, top = 0.8875, 
+            wspace = None, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
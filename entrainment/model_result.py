@@ -0,0 +1,360 @@
+import json
+import numpy as np
+import os
+from box import Box
+
+class ModelResult:
+    """Columnar result of the entrainment model.
+    
+    ``ModelResult`` stores the ``tau`` values of every model step in a single
+    ``(steps, n)`` float array, the ``k`` values in a ``(n, )`` vector, and
+    an index of the ``(cycle, label)`` pair of each step. ``tau()`` returns 
+    zero-copy, read-only views of this array. A label alone refers to its 
+    last cycle. Float arrays given to ``ModelResult()`` are not copied, but 
+    stay writeable for their owner.
+    
+    The ``turtles`` attribute keeps the old ``Box`` interface working (e.g.,
+    ``list(model.turtles)``, ``model.turtles["summer"]`` or
+    ``model.turtles.summer``), building the turtles/subjects ``Box`` objects
+    on demand.
+    
+    :Example:
+    
+    >>> model = entrainment.run_model(plot = False)
+    >>> model.exposures
+    >>> model.steps
+    >>> model.tau("summer")
+    >>> model.tau("winter", cycle = 2)
+    >>> model.turtles.summer[0]
+    
+    A result read by ``load_model()`` loads the ``tau`` values of each step 
+    only when they are first requested (see ``loaded``).
+    """
+    __slots__ = (
+        "_tau", "_k", "_labels", "_cycles", "_index", "_variance", "_cache",
+        "settings"
+        )
+    
+    def __init__(
+        self, tau, k, exposures, settings = None, variance = None, 
+        cycles = None
+        ):
+        self._tau = as_rows(tau)
+        self._k = read_only(np.asarray(k, dtype = float))
+        self._labels = tuple(i.lower() for i in exposures)
+        
+        ## Without cycles, each repeated label starts a new cycle
+        if cycles is None:
+            count = {}
+            cycles = []
+            
+            for i in self._labels:
+                count[i] = count.get(i, 0) + 1
+                cycles.append(0 if i == "unentrained" else count[i])
+        
+        self._cycles = tuple(int(i) for i in cycles)
+        self._index = {}
+        
+        for i, j in enumerate(zip(self._cycles, self._labels)):
+            self._index[j] = i
+            self._index[j[1]] = i
+        
+        if variance is None:
+            self._variance = None
+        else:
+            self._variance = as_rows(variance)
+        
+        self.settings = settings
+        self._cache = {}
+
+    def __repr__(self):
+        return (
+            "ModelResult(n = {n}, exposures = {exposures}, steps = {steps})"
+            .format(
+                n = len(self._k), exposures = list(self.exposures), 
+                steps = len(self._labels)
+                )
+            )
+    
+    def __getitem__(self, key):
+        """Allow the ``model["turtles"]`` syntax of the old ``Box`` result."""
+        if key in ("turtles", "settings", "variance"):
+            return getattr(self, key)
+        else:
+            raise KeyError(key)
+    
+    @property
+    def exposures(self):
+        """Exposure labels, in simulation order (without repetitions)."""
+        return tuple(dict.fromkeys(self._labels))
+    
+    @property
+    def k(self):
+        """``k`` values of the turtles/subjects."""
+        return self._k
+    
+    @property
+    def loaded(self):
+        """Whether all ``tau`` values are in memory (see ``load_model()``)."""
+        return not isinstance(self._tau, LazyRows)
+    
+    @property
+    def n(self):
+        """Number of turtles/subjects."""
+        return len(self._k)
+    
+    @property
+    def nbytes(self):
+        """Number of bytes used by the result arrays."""
+        out = self._tau.nbytes + self._k.nbytes
+        if self._variance is not None: out += self._variance.nbytes
+        
+        return out
+    
+    @property
+    def steps(self):
+        """``(cycle, label)`` pair of each model step (row of ``tau()``)."""
+        return tuple(zip(self._cycles, self._labels))
+    
+    @property
+    def turtles(self):
+        """``Box``-compatible accessor to the turtles/subjects."""
+        return ModelTurtles(self)
+    
+    @property
+    def variance(self):
+        """``tau`` variances across repetitions (``None`` if not available)."""
+        if self._variance is None: return None
+        
+        return Box(
+            {i: self._variance[self._index[i]] for i in self.exposures},
+            frozen_box = True
+            )
+    
+    def index(self, exposure, cycle = None):
+        """Get the row index of an exposure.
+        
+        ``exposure`` can be a row index, a label (e.g., ``"winter"``) or a 
+        ``(cycle, label)`` pair (e.g., ``(2, "winter")``). A label alone 
+        refers to its last cycle, unless ``cycle`` is given.
+        """
+        if isinstance(exposure, (int, np.integer)):
+            return int(exposure)
+        elif isinstance(exposure, tuple):
+            return self._index[(exposure[0], exposure[1].lower())]
+        elif cycle is None:
+            return self._index[exposure.lower()]
+        else:
+            return self._index[(cycle, exposure.lower())]
+    
+    def memoize(self, key, fun):
+        """Get a value derived from the result, computing it only once.
+        
+        ``fun`` is called with the model the first time ``key`` is requested.
+        Later calls return the cached value. The result arrays are read-only,
+        so cached values never go stale.
+        """
+        if not key in self._cache: self._cache[key] = fun(self)
+        
+        return self._cache[key]
+    
+    def tau(self, exposure = None, cycle = None):
+        """Get the ``tau`` values of an exposure (a view, without copies).
+        
+        See ``index()`` for the accepted ``exposure`` and ``cycle`` values. If 
+        ``exposure`` is ``None``, the whole ``(steps, n)`` array is returned
+        (loading all steps, if needed).
+        """
+        if exposure is None:
+            if not self.loaded: self._tau = read_only(np.asarray(self._tau))
+            
+            return self._tau
+        else:
+            return self._tau[self.index(exposure, cycle)]
+
+class ModelTurtles:
+    """``Box``-compatible view of the turtles/subjects of a ``ModelResult``."""
+    __slots__ = ("_model", )
+    
+    def __init__(self, model):
+        self._model = model
+    
+    def __getitem__(self, exposure):
+        return array_to_turtles(self._model.tau(exposure), self._model.k)
+    
+    def __getattr__(self, exposure):
+        if exposure.startswith("_"): raise AttributeError(exposure)
+        
+        try:
+            return self[exposure]
+        except KeyError:
+            raise AttributeError(exposure) from None
+    
+    def __iter__(self):
+        return iter(self._model.exposures)
+    
+    def __len__(self):
+        return len(self._model.exposures)
+    
+    def __contains__(self, exposure):
+        return exposure in self._model.exposures
+    
+    def keys(self):
+        return list(self._model.exposures)
+    
+    def values(self):
+        return [self[i] for i in self._model.exposures]
+    
+    def items(self):
+        return [(i, self[i]) for i in self._model.exposures]
+
+class LazyRows:
+    """Rows of a ``(steps, n)`` array saved by ``save_model()``.
+    
+    Each row is read from the ``.npz`` file at ``path`` (and kept) the first 
+    time it is requested. The file is opened only while reading.
+    """
+    __slots__ = ("_path", "_prefix", "_rows", "_steps")
+    
+    def __init__(self, path, prefix, steps):
+        self._path = path
+        self._prefix = prefix
+        self._rows = {}
+        self._steps = steps
+    
+    def __getitem__(self, i):
+        if not i in self._rows:
+            with np.load(self._path) as data:
+                row = data["{}_{}".format(self._prefix, i)]
+            
+            self._rows[i] = read_only(row)
+        
+        return self._rows[i]
+    
+    def __len__(self):
+        return self._steps
+    
+    def __array__(self, dtype = None, copy = None):
+        return np.stack([self[i] for i in range(self._steps)]).astype(
+            float if dtype is None else dtype, copy = False
+            )
+    
+    @property
+    def nbytes(self):
+        """Number of bytes of the rows loaded so far."""
+        return sum(i.nbytes for i in self._rows.values())
+
+def save_model(model, path):
+    """Save a model result to a compressed ``.npz`` file.
+    
+    The ``tau`` values (and variances) of each model step are stored as a 
+    separate compressed array, so ``load_model()`` can read one step without
+    reading the others. ``k``, the ``(cycle, label)`` pair of each step and
+    the ``settings`` (as JSON) are stored too. Like ``np.savez()``, a 
+    ``.npz`` extension is added to ``path`` if it has none. Returns the path
+    of the file.
+    
+    :Example:
+    
+    >>> model = entrainment.run_model(plot = False)
+    >>> entrainment.save_model(model, "model.npz")
+    >>> model = entrainment.load_model("model.npz")
+    """
+    path = get_npz_path(path)
+    steps = range(len(model.steps))
+    arrays = {"tau_{}".format(i): model.tau(i) for i in steps}
+    
+    if not model._variance is None:
+        arrays.update({
+            "variance_{}".format(i): model._variance[i] for i in steps
+            })
+    
+    np.savez_compressed(
+        path, k = model.k, labels = np.array(model._labels, dtype = str),
+        cycles = np.array(model._cycles), 
+        settings = np.array(json.dumps(model.settings, default = to_json)),
+        **arrays
+        )
+    
+    return path
+
+def load_model(path, lazy = True):
+    """Load a model result saved by ``save_model()``.
+    
+    With ``lazy = True``, the ``tau`` values of each step are only read when 
+    first requested (e.g., ``model.tau("summer")`` or 
+    ``analyze_model(model, "summer")``). Asking for all steps at once (e.g., 
+    ``model.tau()`` or ``plot_model_line(model)``) reads the remaining ones.
+    With ``lazy = False``, the whole file is read at once. As in 
+    ``save_model()``, a ``.npz`` extension is added to ``path`` if it has 
+    none.
+    """
+    path = get_npz_path(path)
+    
+    with np.load(path) as data:
+        k, labels, cycles = data["k"], list(data["labels"]), data["cycles"]
+        settings = json.loads(str(data["settings"]))
+        steps = len(labels)
+        has_variance = "variance_0" in data.files
+        
+        if lazy == False:
+            tau = np.stack([data["tau_{}".format(i)] for i in range(steps)])
+            
+            if has_variance == True:
+                variance = np.stack([
+                    data["variance_{}".format(i)] for i in range(steps)
+                    ])
+    
+    if lazy == True:
+        tau = LazyRows(path, "tau", steps)
+        if has_variance == True: variance = LazyRows(path, "variance", steps)
+    
+    if has_variance == False: variance = None
+    
+    if not settings is None: settings = Box(settings, frozen_box = True)
+    
+    return ModelResult(
+        tau = tau, k = k, exposures = labels, settings = settings,
+        variance = variance, cycles = cycles
+        )
+
+def get_npz_path(path):
+    """Add a ``.npz`` extension to ``path`` if it has none."""
+    path = os.fspath(path)
+    
+    if not path.endswith(".npz"): path = path + ".npz"
+    
+    return path
+
+def to_json(x):
+    """Convert NumPy values for ``json.dumps()``."""
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    elif isinstance(x, np.generic):
+        return x.item()
+    else:
+        raise TypeError(type(x).__name__)
+
+def as_rows(x):
+    """Get a read-only ``(steps, n)`` array (or keep ``LazyRows``)."""
+    if isinstance(x, LazyRows):
+        return x
+    else:
+        return read_only(np.asarray(x, dtype = float))
+
+def array_to_turtles(tau, k):
+    """Convert ``tau`` and ``k`` arrays to a tuple of turtles/subjects."""
+    return tuple(
+        Box(tau = i, k = j, frozen_box = True) for i, j in zip(tau, k)
+        )
+
+def read_only(x):
+    """Get a read-only view of a NumPy array.
+    
+    The flag is set on a view, so the array itself (e.g., the one passed to
+    ``ModelResult()`` by its caller) stays writeable.
+    """
+    x = x.view()
+    x.flags.writeable = False
+    
+    return x
@@ -2,15 +2,26 @@ import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 from .get_labren_data import get_labren_data
-from .utils import reorder
+from .utils import get_figure, reorder, show_figure
 
-def plot_model_line(model):
-    """Plot the entrainment model."""
+def plot_model_line(model, kde = "fft", ax = None, fig = None, show = True):
+    """Plot the entrainment model.
+    
+    With ``kde = "fft"`` (default), the densities of all exposures are 
+    computed at once by ``get_model_density()`` and cached on ``model``. Use 
+    ``kde = "seaborn"`` to draw them with ``sns.kdeplot()`` instead.
+    
+    Like all ``plot_*`` functions, it draws on ``ax`` (if given), on ``fig`` 
+    (cleared first) or on a new figure, and returns the figure. Set 
+    ``show = False`` to skip ``plt.show()`` (e.g., to save the figure). See 
+    ``save_figures()`` to export many figures at once.
+    """
+    check_kde(kde)
+    
     settings = model.settings
     turtles = model.turtles
     
-    colors = plot_model_colors(model)
-    if not len(colors) == 1: colors = reorder(colors, settings.start_at)
+    colors = get_model_colors(model)
     labels = [i.title() for i in list(turtles)]
     
     title = ("N = ${n}$, $\\lambda_c = {lam_c}$, Latitude = ${lat}$, " +\
@@ -20,54 +31,52 @@ def plot_model_line(model):
                  n = settings.n, lam_c = settings.lam_c, 
                  lat = get_labren_data(settings.labren_id)["lat"], 
                  n_cycles = settings.n_cycles, 
-                 start = list(turtles)[1].title(), 
+                 start = get_model_start(model), 
                  repetitions = settings.repetitions
                      )
     
     plt.rcParams.update({'font.size': 10})
-    plt.clf()
     
-    fig, ax = plt.subplots()
+    adjust = ax is None
+    fig, ax = get_figure(fig, ax)
     
     for i, j in enumerate(turtles):
-        tau_i = [k["tau"] for k in np.array(turtles[j])]
-
-        if (i == 0):
-            color = "black"
-            linewidth = 3
-        else:
-            color = colors[i - 1]
-            linewidth = 1
+        linewidth = 3 if j == "unentrained" else 1
         
-        sns.kdeplot(tau_i, color = color, label = labels[i], 
-                    linewidth = linewidth, warn_singular = False)
+        plot_model_kde(
+            ax, model, j, kde, color = colors[i], label = labels[i], 
+            linewidth = linewidth
+            )
 
     ax.set_xlabel("$\\tau$")
     ax.set_ylabel("Kernel Density Estimate (KDE)")
     ax.set_xlim(23.5, 24.6)
     ax.set_title(title, fontsize = 8)
     
-    plt.legend(fontsize = 8)
+    ax.legend(fontsize = 8)
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.1375, bottom = 0.1625, right = 0.925, top = 0.88125, 
-        wspace = None, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.1375, bottom = 0.1625, right = 0.925, top = 0.88125, 
+            wspace = None, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
 
 def plot_model_line_1_2(
     x, y, x_title = "(A)", y_title = "(B)", legend_plot = "y", 
-    legend_loc = "upper right", legend_fontsize = "small"
+    legend_loc = "upper right", legend_fontsize = "small", kde = "fft",
+    ax = None, fig = None, show = True
     ):
-    colors = plot_model_colors(x)
-    if not len(colors) == 1:
-        x_colors = reorder(colors, x.settings.start_at)
-        y_colors = reorder(colors, y.settings.start_at)
-    else:
-        x_colors, y_colors = colors, colors
+    """Plot two entrainment models side by side.
     
+    See ``plot_model_line()`` for the ``kde`` values and for ``ax`` (here, a
+    pair of axes), ``fig`` and ``show``.
+    """
+    check_kde(kde)
+    
+    x_colors, y_colors = get_model_colors(x), get_model_colors(y)
+
     x_labels = [i.title() for i in list(x.turtles)]
     y_labels = [i.title() for i in list(y.turtles)]
     
@@ -76,41 +85,31 @@ def plot_model_line_1_2(
              .format(
                  n = x.settings.n, lam_c = x.settings.lam_c,
                  n_cycles = x.settings.n_cycles, 
-                 start = list(x.turtles)[1].title(), 
+                 start = get_model_start(x), 
                  repetitions = x.settings.repetitions
                  )
     
     plt.rcParams.update({'font.size': 8})
-    plt.clf()
     
-    fig, [ax_x, ax_y] = plt.subplots(nrows = 1, ncols = 2)
+    adjust = ax is None
+    fig, [ax_x, ax_y] = get_figure(fig, ax, nrows = 1, ncols = 2)
     
     for i, j in enumerate(x.turtles):
-        tau_i = [k["tau"] for k in np.array(x.turtles[j])]
-
-        if (i == 0):
-            color_i = "black"
-            linewidth = 3
-        else:
-            color_i = x_colors[i - 1]
-            linewidth = 1
+        linewidth = 3 if j == "unentrained" else 1
         
-        sns.kdeplot(tau_i, ax = ax_x, color = color_i, label = x_labels[i], 
-                    linewidth = linewidth, warn_singular = False)
+        plot_model_kde(
+            ax_x, x, j, kde, color = x_colors[i], label = x_labels[i], 
+            linewidth = linewidth
+            )
     
     for i, j in enumerate(y.turtles):
-        tau_i = [k["tau"] for k in np.array(y.turtles[j])]
+        linewidth = 3 if j == "unentrained" else 1
         
-        if (i == 0):
-            color_i = "black"
-            linewidth = 3
-        else:
-            color_i = y_colors[i - 1]
-            linewidth = 1
-        
-        sns.kdeplot(tau_i, ax = ax_y, color = color_i, label = y_labels[i], 
-                    linewidth = linewidth, warn_singular = False)
-    
+        plot_model_kde(
+            ax_y, y, j, kde, color = y_colors[i], label = y_labels[i], 
+            linewidth = linewidth
+            )
+
     y_max = np.max([ax_x.get_ylim()[1], ax_y.get_ylim()[1]])
     
     ax_x.set_xlabel("$\\tau$")
@@ -131,31 +130,30 @@ def plot_model_line_1_2(
     else:
         ax_y.legend(loc = legend_loc, fontsize = legend_fontsize)
     
-    plt.suptitle(title, fontsize = 8, y = 0.9375)
+    fig.suptitle(title, fontsize = 8, y = 0.9375)
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.125, bottom = 0.15, right = 0.9375, top = 0.83125, 
-        wspace = None, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.125, bottom = 0.15, right = 0.9375, top = 0.83125, 
+            wspace = None, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
 
-def plot_model_violin(model):
-    """Plot the entrainment model."""
+def plot_model_violin(model, ax = None, fig = None, show = True):
+    """Plot the entrainment model.
+    
+    The violins are drawn from the densities and summaries computed by 
+    ``get_model_violins()`` (cached on ``model``). See ``plot_model_line()``
+    for ``ax``, ``fig`` and ``show``.
+    """
     settings = model.settings
     turtles = model.turtles
     
-    colors = plot_model_colors(model)
-    colors = reorder_plot_model_colors(colors, settings.start_at)
-
-    data = []
-    means = []
+    colors = get_model_colors(model)
     
-    for i in list(turtles):
-        data_i = [j["tau"] for j in np.array(turtles[i])]
-        data.append(data_i)
-        means.append(np.mean(data_i))
+    data = [get_model_violins(model)[model.index(i)] for i in turtles]
+    means = [i["mean"] for i in data]
 
     title = ("N = ${n}$, $\\lambda_c = {lam_c}$, Latitude = ${lat}$, " +\
              "Cycles = ${n_cycles}$, Start = {start}, " +\
@@ -164,185 +162,123 @@ def plot_model_violin(model):
                  n = settings.n, lam_c = settings.lam_c, 
                  lat = get_labren_data(settings.labren_id)["lat"], 
                  n_cycles = settings.n_cycles, 
-                 start = list(turtles)[1].title(), 
+                 start = get_model_start(model), 
                  repetitions = settings.repetitions
                  )
     
     labels_pos = np.arange(1, len(data) + 1)
-    colors.insert(0, "#000000")
-
-    ax_1_labels = list(map(str.title, list(turtles)))
     
-    if model.settings.by == "year":
-        ax_2_labels = [0] + [get_labren_data(
-            model.settings.labren_id,
-            by = model.settings.by)["ts"]
-        ]
-    else:
-        ax_2_labels = [0] + list(get_labren_data(
-            model.settings.labren_id, 
-            by = model.settings.by)["ts"]
-            )
-    
-    ax_2_labels = [int(i) for i in ax_2_labels]
+    ax_1_labels = list(map(str.title, list(turtles)))
+    ax_2_labels = get_model_irradiation(model)
     
     plt.rcParams.update({'font.size': 10})
-    plt.clf()
     
-    fig, ax_1 = plt.subplots()
+    adjust = ax is None
+    fig, ax_1 = get_figure(fig, ax)
     ax_2 = ax_1.twiny()
     
-    ax_1_plot = ax_1.violinplot(
+    ax_1_plot = ax_1.violin(
         data, vert = True, showextrema = False, showmeans = False
         )
     ax_1.scatter(
         labels_pos, means, marker = "o", color = "red", s = 10, zorder = 3
         )
-    ax_2_plot = ax_2.violinplot(
-        data, vert = True, showextrema = False, showmeans = False
-        )
     
     for i, pc in enumerate(ax_1_plot["bodies"]):
         pc.set_facecolor(colors[i])
         pc.set_edgecolor('black')
-    
-    for i, pc in enumerate(ax_2_plot["bodies"]):
-        pc.set_alpha(0)
-    
+        
     ax_1.set_xticks(labels_pos, labels = ax_1_labels)
     ax_1.set_title(title, fontsize = 8, y = 1.1875)
     ax_1.set_xlabel("Exposure")
     ax_1.set_ylabel("$\\tau$")
+    ax_2.set_xlim(ax_1.get_xlim())
     ax_2.set_xticks(labels_pos, labels = ax_2_labels)
     ax_2.set_xlabel("$Wh / m^{2}.day$")
     
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.1375, bottom = 0.16875, right = 0.95, top = 0.775, 
-        wspace = None, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.1375, bottom = 0.16875, right = 0.95, top = 0.775, 
+            wspace = None, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
 
 def plot_model_violin_1_2(
     x, y, x_title = "(A)", y_title = "(B)", legend_plot = "y", 
-    legend_loc = "upper right", legend_fontsize = "small"
+    legend_loc = "upper right", legend_fontsize = "small", ax = None, 
+    fig = None, show = True
     ):
-    x_colors = plot_model_colors(x)
-    x_colors = reorder_plot_model_colors(x_colors, x.settings.start_at)
-    y_colors = plot_model_colors(y)
-    y_colors = reorder_plot_model_colors(y_colors, y.settings.start_at)
-    
-    x_data = []
-    x_means = []
+    """Plot two entrainment models side by side.
     
-    for i in list(x.turtles):
-        data_i = [j["tau"] for j in np.array(x.turtles[i])]
-        x_data.append(data_i)
-        x_means.append(np.mean(data_i))
+    See ``plot_model_violin()`` for the violins and ``plot_model_line()`` for
+    ``ax`` (here, a pair of axes), ``fig`` and ``show``.
+    """
+    x_colors = get_model_colors(x)[::-1]
+    y_colors = get_model_colors(y)[::-1]
     
-    y_data = []
-    y_means = []
+    x_data = [get_model_violins(x)[x.index(i)] for i in x.turtles]
+    x_means = [i["mean"] for i in x_data]
     
-    for i in list(y.turtles):
-        data_i = [j["tau"] for j in np.array(y.turtles[i])]
-        y_data.append(data_i)
-        y_means.append(np.mean(data_i))
+    y_data = [get_model_violins(y)[y.index(i)] for i in y.turtles]
+    y_means = [i["mean"] for i in y_data]
     
     title = ("N = ${n}$, $\\lambda_c = {lam_c}$, Cycles = ${n_cycles}$, " +\
              "Start = {start}, Repetitions = ${repetitions}$")\
              .format(
                  n = x.settings.n, lam_c = x.settings.lam_c,
                  n_cycles = x.settings.n_cycles, 
-                 start = list(x.turtles)[1].title(), 
+                 start = get_model_start(x), 
                  repetitions = x.settings.repetitions
                  )
     
     x_labels_pos = np.arange(1, len(x.turtles) + 1)[::-1]
     ax_x_1_labels = list(map(str.title, list(x.turtles)))
-    
-    if x.settings.by == "year":
-        ax_x_2_labels = [0] + [get_labren_data(
-            x.settings.labren_id, 
-            by = x.settings.by)["ts"]
-            ]
-    else:
-        ax_x_2_labels = [0] + list(get_labren_data(
-            x.settings.labren_id, 
-            by = x.settings.by)["ts"]
-            )
-    
-    ax_x_2_labels = [int(i) for i in ax_x_2_labels]
+    ax_x_2_labels = get_model_irradiation(x)
     
     y_labels_pos = np.arange(1, len(y.turtles) + 1)[::-1]
     ax_y_1_labels = list(map(str.title, list(y.turtles)))
-    
-    if y.settings.by == "year":
-        ax_y_2_labels = [0] + [get_labren_data(
-            y.settings.labren_id, 
-            by = y.settings.by)["ts"]
-            ]
-    else:
-        ax_y_2_labels = [0] + list(get_labren_data(
-            y.settings.labren_id, 
-            by = y.settings.by)["ts"]
-            )
-    
-    ax_y_2_labels = [int(i) for i in ax_y_2_labels]
-    
-    x_colors = (["#000000"] + x_colors)[::-1]
-    y_colors = (["#000000"] + y_colors)[::-1]
+    ax_y_2_labels = get_model_irradiation(y)
     
     x_data.reverse()
     y_data.reverse()
     
     plt.rcParams.update({'font.size': 8})
-    plt.clf()
     
-    fig, [ax_x_1, ax_y_1] = plt.subplots(nrows = 1, ncols = 2)
+    adjust = ax is None
+    fig, [ax_x_1, ax_y_1] = get_figure(fig, ax, nrows = 1, ncols = 2)
     ax_x_2, ax_y_2 = ax_x_1.twinx(), ax_y_1.twinx()
 
-    ax_x_1_plot = ax_x_1.violinplot(
+    ax_x_1_plot = ax_x_1.violin(
         x_data, vert = False, showextrema = False, showmeans = False
         )
     ax_x_1.scatter(
         x_means, x_labels_pos, marker = "o", color = "red", s = 10, 
         zorder = 3
         )
-    ax_x_2_plot = ax_x_2.violinplot(
-        x_data, vert = False, showextrema = False, showmeans = False
-        )
     
     for i, pc in enumerate(ax_x_1_plot["bodies"]):
         pc.set_facecolor(x_colors[i])
         pc.set_edgecolor('black')
     
-    for i, pc in enumerate(ax_x_2_plot["bodies"]):
-        pc.set_alpha(0)
-    
-    ax_y_1_plot = ax_y_1.violinplot(
+    ax_y_1_plot = ax_y_1.violin(
         y_data, vert = False, showextrema = False, showmeans = False
         )
     ax_y_1.scatter(
         y_means, y_labels_pos, marker = "o", color = "red", s = 10, zorder = 3
         )
-    ax_y_2_plot = ax_y_2.violinplot(
-        y_data, vert = False, showextrema = False, showmeans = False
-        )
     
     for i, pc in enumerate(ax_y_1_plot["bodies"]):
         pc.set_facecolor(y_colors[i])
         pc.set_edgecolor('black')
-    
-    for i, pc in enumerate(ax_y_2_plot["bodies"]):
-        pc.set_alpha(0)
-    
+        
     ax_x_1.set_yticks(x_labels_pos, labels = ax_x_1_labels)
     ax_x_1.set_ylabel("Exposure")
     ax_x_1.set_xlabel("$\\tau$")
     ax_x_1.set_title(x_title)
     ax_x_1.set_xlim(23.5, 24.6)
+    ax_x_2.set_ylim(ax_x_1.get_ylim())
     ax_x_2.set_yticks(x_labels_pos, labels = ax_x_2_labels)
     
     ax_y_1.set_yticks(y_labels_pos, labels = ax_y_1_labels)
@@ -350,22 +286,23 @@ def plot_model_violin_1_2(
     ax_y_1.set_title(y_title)
     ax_y_1.set_xlim(23.5, 24.6)
     ax_y_1.get_yaxis().set_visible(False)
+    ax_y_2.set_ylim(ax_y_1.get_ylim())
     ax_y_2.set_yticks(y_labels_pos, labels = ax_y_2_labels)
     ax_y_2.set_ylabel("$Wh / m^{2}.day$", labelpad = 5)
     
-    plt.suptitle(title, fontsize = 8, y = 0.9375)
+    fig.suptitle(title, fontsize = 8, y = 0.9375)
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.19375, bottom = 0.15625, right = 0.8625, top = 0.8375,
-        wspace = 0.4, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.19375, bottom = 0.15625, right = 0.8625, top = 0.8375,
+            wspace = 0.4, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
 
 def plot_model_dynamics(
     tau = 26, k = 2, lam_c = 5, tau_ref = 24, lam_0 = 0, lam_n = 10, 
-    h = 10**(- 3)
+    h = 10**(- 3), ax = None, fig = None, show = True
     ):
     """Plot the (un)entrainment dynamic in a given interval.
     
@@ -376,6 +313,10 @@ def plot_model_dynamics(
     This function has already a set of default values configured for testing
     purposes. To see it in action, just run ``plot_model_dynamics()``.
     
+    ``tau``, ``k``, ``lam_c`` and ``tau_ref`` can also be lists of values. In
+    this case, a family of curves is drawn, one for each combination of 
+    values, all computed at once by ``get_exact_entrain()``.
+    
     **Guidelines**
     
     The (un)entrainment function computation without its error (:math:`E`) term
@@ -403,18 +344,18 @@ def plot_model_dynamics(
     
     :param tau: (optional) The actual subject's circadian phenotype (period) 
         given in decimal hours (default: ``26``).
-    :type tau: int, float
+    :type tau: int, float, list
     :param k: (optional) Exposure factor, indicating the subject's sensibility 
         to entrainment (default: ``2``).
-    :type k: int, float
+    :type k: int, float, list
     :param lam_c: (optional) Threshold/critial value of the global horizontal 
         solar irradiation, indicating the onset of the entrainment phenomenon
         (default: ``5``).
-    :type lam_c: int, float
+    :type lam_c: int, float, list
     :param tau_ref: (optional) reference period to which the subject must 
         entrain. This can be 24 hour light/dark period or the subject's own 
         endogenous period (default: ``24``).
-    :type tau: int, float
+    :type tau_ref: int, float, list
     :param lam_0: (optional) The start of the plot interval (default: ``0``).
     :type lam_0: int, float
     :param lam_n: (optional) The end of the plot interval (default: ``10``).
@@ -423,9 +364,18 @@ def plot_model_dynamics(
         indicates the interval between each data point 
         (default: ``10**(- 3))``).
     :type h: int, float
-    
-    :return: A ``None`` value. This function don't aim to return values.
-    :rtype: None
+    :param ax: (optional) The axes to draw on (default: ``None``, a new 
+        figure).
+    :type ax: matplotlib.axes.Axes
+    :param fig: (optional) A figure to reuse. It is cleared before drawing
+        (default: ``None``).
+    :type fig: matplotlib.figure.Figure
+    :param show: (optional) Whether to call ``plt.show()`` 
+        (default: ``True``).
+    :type show: bool
+    
+    :return: The figure.
+    :rtype: matplotlib.figure.Figure
     
     :Example:
     
@@ -433,21 +383,41 @@ def plot_model_dynamics(
         tau = 22, k = 2, lam_c = 5, tau_ref = 24, lam_0 = 0, lam_n = 10,
         h = 10**(- 3)
         )
+    
+    >>> entrainment.plot_model_dynamics(tau = [22, 26], k = [0.5, 1, 2])
     """
-    data = get_exact_entrain(tau, k, lam_c, tau_ref, lam_0, lam_n)
-
-    title = ("$\\tau = {tau}$, $k = {k}$, $\\lambda_c = {lam_c}$, " +\
-             "$\\tau_{ref_latex} = {tau_ref}$")\
-            .format(
-                tau = tau, k = k, lam_c = lam_c, tau_ref = tau_ref,
-                ref_latex = "{ref}"
-                )
-
+    latex = ["\\tau", "k", "\\lambda_c", "\\tau_{ref}"]
+    values = [np.atleast_1d(i) for i in [tau, k, lam_c, tau_ref]]
+    params = [i.ravel() for i in np.meshgrid(*values, indexing = "ij")]
+    lam, data = get_exact_entrain(*params, lam_0 = lam_0, lam_n = lam_n, h = h)
+    data = np.atleast_2d(data)
+    
+    ## Fixed values go to the title and varying values to the legend
+    fixed = [i for i in range(len(values)) if len(values[i]) == 1]
+    varying = [i for i in range(len(values)) if len(values[i]) > 1]
+    title = ", ".join(
+        "${} = {:g}$".format(latex[i], values[i][0]) for i in fixed
+        )
+    
     plt.rcParams.update({'font.size': 10})
-    plt.clf()
     
-    fig, ax = plt.subplots()
-    ax.plot(data[0], data[1], "r-", linewidth = 1)
+    adjust = ax is None
+    fig, ax = get_figure(fig, ax)
+    
+    if len(data) == 1:
+        ax.plot(lam, data[0], "r-", linewidth = 1)
+    else:
+        colors = sns.color_palette("viridis", len(data))
+        
+        for j in range(len(data)):
+            label = ", ".join(
+                "${} = {:g}$".format(latex[i], params[i][j]) for i in varying
+                )
+            ax.plot(lam, data[j], color = colors[j], label = label, 
+                    linewidth = 1)
+        
+        ax.legend(fontsize = 8)
+    
     ax.set_xlabel("$\\lambda$")
     ax.set_ylabel(
         "$f(\\tau, k, \\lambda, \\lambda_c, \\tau_{ref_latex}$)"\
@@ -456,35 +426,203 @@ def plot_model_dynamics(
     ax.set_title(title, fontsize = 10)
     
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.15625, bottom = 0.16875, right = 0.95, top = 0.8875,
-        wspace = None, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.15625, bottom = 0.16875, right = 0.95, top = 0.8875,
+            wspace = None, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
 
 def exact_entrain(tau, k, lam, lam_c, tau_ref = 24):
     """Compute the exact (un)entrainment function."""
-    logi_f = (tau_ref - tau) / (1 + np.exp(1) ** (- k * (lam - lam_c)))
+    logi_f = (tau_ref - tau) / (1 + np.exp(- k * (lam - lam_c)))
     out = tau + logi_f
-
+    
     return out
 
 def get_exact_entrain(
     tau, k, lam_c, tau_ref = 24, lam_0 = 0, lam_n = 10, h = 10 ** (- 3)
     ):
-    """Compute the exact (un)entrainment function data points in a interval."""
-    lam_list, y_list = [lam_0], [exact_entrain(tau, k, lam_0, lam_c, tau_ref)]
+    """Compute the exact (un)entrainment function data points in a interval.
+    
+    The ``lam`` values are evenly spaced from ``lam_0`` to ``lam_n`` (both 
+    included), about ``h`` apart. ``tau``, ``k``, ``lam_c`` and ``tau_ref`` 
+    can be arrays, which are broadcast against each other: the result then 
+    holds a curve (along the last axis) for each combination. Returns the 
+    ``lam`` values and the function values.
+    
+    :Example:
+    
+    >>> lam, y = get_exact_entrain(
+        np.array([22, 26])[:, np.newaxis], np.array([0.5, 1, 2]), lam_c = 5
+        )
+    >>> y.shape
+    (2, 3, 10001)
+    """
+    lam = np.linspace(lam_0, lam_n, int(round((lam_n - lam_0) / h)) + 1)
+    tau, k, lam_c, tau_ref = [
+        np.asarray(i, dtype = float)[..., np.newaxis] 
+        for i in [tau, k, lam_c, tau_ref]
+        ]
+    
+    return lam, exact_entrain(tau, k, lam, lam_c, tau_ref)
+
+def plot_model_kde(ax, model, exposure, kde = "fft", **kwargs):
+    """Draw the density of an exposure of ``model`` on ``ax``."""
+    if kde == "fft":
+        grid, density = get_model_density(model)
+        i = model.index(exposure)
+        ax.plot(grid[i], density[i], **kwargs)
+    else:
+        sns.kdeplot(
+            model.tau(exposure), ax = ax, warn_singular = False, **kwargs
+            )
+    
+    return None
+
+def check_kde(kde):
+    if not kde in ["fft", "seaborn"]:
+        raise ValueError("'kde' must be \"fft\" or \"seaborn\".")
+    
+    return None
+
+def get_model_density(model, tau_range = None, size = 2048):
+    """Get the densities of all model steps on grids within ``tau_range``.
+    
+    ``tau_range`` defaults to the ``tau_range`` of the model (or 
+    ``(23.5, 24.6)``). Returns ``(steps, size)`` arrays of grids and
+    densities, in the order of ``model.steps`` (see ``get_kde()``). The result
+    is cached on ``model``, so redrawing a model (or comparing it with 
+    another) is free.
+    """
+    if tau_range == None: tau_range = get_model_tau_range(model)
+    
+    tau_range = tuple(tau_range)
+    
+    return model.memoize(
+        ("get_model_density", tau_range, size), 
+        lambda model: get_kde(model.tau(), tau_range, size)
+        )
+
+def get_model_violins(model, tau_range = None, size = 2048):
+    """Get the statistics to draw the violins of all model steps.
+    
+    Returns a ``list`` with one ``dict`` for each step, in the order of 
+    ``model.steps``, as expected by ``ax.violin()``. The densities come from
+    ``get_model_density()`` and are cut at the range of each step, as 
+    ``ax.violinplot()`` does. The result is cached on ``model``, so the raw
+    ``tau`` values are only summarized once.
+    """
+    if tau_range == None: tau_range = get_model_tau_range(model)
     
-    while lam_0 < lam_n:
-        x_next = lam_0 + h
-        y_next = exact_entrain(tau, k, x_next, lam_c)
-        lam_0 = x_next
-        lam_list.append(x_next)
-        y_list.append(y_next)
+    tau_range = tuple(tau_range)
     
-    return lam_list, y_list
+    return model.memoize(
+        ("get_model_violins", tau_range, size), 
+        lambda model: get_violin_stats(
+            model.tau(), *get_model_density(model, tau_range, size)
+            )
+        )
+
+def get_violin_stats(data, grid, density):
+    """Summarize the rows of ``data`` for ``ax.violin()``.
+    
+    ``density`` holds the densities of each row on its row of ``grid`` (see 
+    ``get_kde()``). Each violin keeps the grid points within the range of its
+    row (plus one point on each side, so narrow rows are still drawn).
+    """
+    delta = grid[:, 1] - grid[:, 0]
+    quantiles = np.quantile(data, [0, 0.5, 1], axis = 1)
+    means = np.mean(data, axis = 1)
+    out = []
+    
+    for i in range(len(data)):
+        keep = (grid[i] >= quantiles[0][i] - delta[i]) & \
+            (grid[i] <= quantiles[2][i] + delta[i])
+        
+        out.append({
+            "coords": grid[i][keep], "vals": density[i][keep], "mean": means[i],
+            "median": quantiles[1][i], "min": quantiles[0][i], 
+            "max": quantiles[2][i], "quantiles": []
+            })
+    
+    return out
+
+def get_model_tau_range(model):
+    if model.settings == None or not "tau_range" in model.settings:
+        return (23.5, 24.6)
+    else:
+        return model.settings.tau_range
+
+def get_kde(data, tau_range = (23.5, 24.6), size = 2048):
+    r"""Compute Gaussian KDEs of the rows of ``data``, each on its own grid.
+    
+    The bandwidths follow Scott's rule, as in ``sns.kdeplot()``. Like its 
+    ``cut = 3``, the grid of each row spans its values plus three bandwidths
+    on each side (within ``tau_range``; values outside it are dropped). The 
+    values are linearly binned on the ``size`` points of the grid and smoothed
+    with a FFT convolution, all rows at once. Each row costs 
+    :math:`O(n + size \log size)`, instead of the :math:`O(n \times size)` of
+    an exact KDE.
+    
+    Since the grid follows the spread of each row, the bandwidth spans many 
+    grid points even for rows that are almost entrained. Rows where it spans
+    fewer than ``3`` points (e.g., a few extreme outliers) are computed with
+    an exact KDE instead.
+    
+    Returns a ``(rows, size)`` array of grids and one of densities.
+    """
+    data = np.atleast_2d(data)
+    rows, n = data.shape
+    bandwidth = np.std(data, axis = 1, ddof = 1) * n ** (- 1 / 5)
+    low = np.maximum(np.min(data, axis = 1) - 3 * bandwidth, tau_range[0])
+    high = np.minimum(np.max(data, axis = 1) + 3 * bandwidth, tau_range[1])
+    
+    ## Constant rows (or rows outside ``tau_range``) use the whole range
+    empty = ~(high > low)
+    low[empty], high[empty] = tau_range[0], tau_range[1]
+    
+    grid = np.linspace(low, high, size, axis = 1)
+    delta = (high - low) / (size - 1)
+    
+    ## Linear binning, with one block of ``size`` bins for each row
+    inside = (data >= low[:, np.newaxis]) & (data <= high[:, np.newaxis])
+    position = (data - low[:, np.newaxis]) / delta[:, np.newaxis]
+    position = np.clip(position[inside], 0, size - 1)
+    left = np.minimum(np.floor(position), size - 2).astype(int)
+    weight = position - left
+    left = left + np.nonzero(inside)[0] * size
+    counts = np.bincount(left, 1 - weight, rows * size) +\
+        np.bincount(left + 1, weight, rows * size)
+    counts = counts.reshape(rows, size)
+    
+    ## Gaussian smoothing in the frequency domain (zero-padded, to avoid 
+    ## wrapping the tails around the grid)
+    freq = np.fft.rfftfreq(2 * size)
+    kernel = np.exp(
+        - 0.5 * (2 * np.pi * freq * (bandwidth / delta)[:, np.newaxis]) ** 2
+        )
+    out = np.fft.irfft(np.fft.rfft(counts, 2 * size) * kernel, 2 * size)
+    out = np.maximum(out[:, :size], 0) / (n * delta[:, np.newaxis])
+    
+    for i in np.nonzero((bandwidth < 3 * delta) & (bandwidth > 0))[0]:
+        out[i] = get_exact_kde(data[i], grid[i], bandwidth[i])
+    
+    return grid, out
+
+def get_exact_kde(data, grid, bandwidth, chunk_size = 10**4):
+    """Compute an exact Gaussian KDE of ``data`` on ``grid``.
+    
+    The values are summed ``chunk_size`` at a time, to bound memory use.
+    """
+    out = np.zeros(len(grid))
+    
+    for i in range(0, len(data), chunk_size):
+        z = (grid[:, np.newaxis] - data[np.newaxis, i:(i + chunk_size)])
+        out += np.sum(np.exp(- 0.5 * (z / bandwidth) ** 2), axis = 1)
+    
+    return out / (len(data) * bandwidth * np.sqrt(2 * np.pi))
 
 def plot_model_colors(model):
     if model.settings.by == "month":
@@ -501,3 +639,53 @@ def reorder_plot_model_colors(colors, start_at = 0):
         colors = reorder(colors, start_at)
     
     return colors
+
+def get_exposure_labels(by = "season"):
+    """Get the exposure labels of ``by``, in the order of their colors."""
+    if by == "month":
+        return [
+            "jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", 
+            "oct", "nov", "dec"
+            ]
+    elif by == "season":
+        return ["summer", "autumn", "winter", "spring"]
+    else:
+        return ["annual"]
+
+def get_model_colors(model):
+    """Get the color of each exposure of ``model``, by its label.
+    
+    The unentrained turtles/subjects are black and every other exposure keeps
+    the color of its label (see ``plot_model_colors()``), whatever steps 
+    ``model`` recorded.
+    """
+    colors = plot_model_colors(model)
+    labels = get_exposure_labels(model.settings.by)
+    
+    return [
+        "#000000" if i == "unentrained" else colors[labels.index(i)]
+        for i in model.turtles
+        ]
+
+def get_model_irradiation(model):
+    """Get the irradiation of each exposure of ``model``, by its label.
+    
+    The unentrained turtles/subjects get ``0``.
+    """
+    labels = get_exposure_labels(model.settings.by)
+    data = np.atleast_1d(get_labren_data(
+        model.settings.labren_id, by = model.settings.by
+        )["ts"])
+    
+    return [
+        0 if i == "unentrained" else int(data[labels.index(i)]) 
+        for i in model.turtles
+        ]
+
+def get_model_start(model):
+    """Get the label of the first exposure of a cycle of ``model``."""
+    labels = get_exposure_labels(model.settings.by)
+    
+    if model.settings.by == "year": return labels[0].title()
+    
+    return labels[model.settings.start_at].title()
@@ -1,23 +1,92 @@
 import functools
 import matplotlib.pyplot as plt
 import numpy as np
+import warnings
+from concurrent.futures import as_completed
 from .get_labren_data import get_labren_data
+from .model_result import ModelResult, array_to_turtles
 from .plot_model import plot_model_line
-from .utils import cli_progress_step, reorder
+from .utils import cli_progress_step, get_executor, get_rng
+from .utils import get_seed_sequence, reorder
 from alive_progress import alive_bar
 from box import Box
+from scipy import special, stats
 
 def run_model(
     n = 10**3, tau_range = (23.5, 24.6), tau_mean = 24.15, tau_sd = 0.2, 
     k_range = (0.001, 0.01), k_mean = 0.001, k_sd = 0.005, lam_c = 3750, 
     labren_id = 1, by = "season", n_cycles = 3, start_at = 0, 
-    repetitions = 10**2, plot = True, show_progress = True
+    repetitions = 10**2, plot = True, show_progress = True, engine = "array",
+    chunk_size = 10, workers = None, seed = None, bit_generator = "PCG64",
+    truncation = "clip", backend = "numpy", record = None, tolerance = 1e-3,
+    max_cycles = 20, precision = 0.01, max_repetitions = 10**3
     ):
     """Compute the entrainment model.
     
     This function has already a set of default values configured for testing
     purposes. To see it in action, just run ``run_model()``.
     
+    By default (``engine = "array"``) the turtles are entrained as NumPy 
+    vectors, updating the whole population at each exposure in one pass. Use 
+    ``engine = "box"`` to run the original turtle-by-turtle implementation, 
+    kept as a reference. The array engine simulates ``chunk_size`` 
+    repetitions at a time as a ``(chunk_size, n)`` array, which also bounds its
+    memory use.
+    
+    With ``backend = "numba"``, each step of the array engine runs as a
+    compiled Numba kernel, which updates the turtles in a single parallel
+    pass, without temporary arrays. If Numba is not installed, the NumPy
+    backend (``backend = "numpy"``) is used instead, with a warning. Both
+    backends give the same results.
+    
+    With ``repetitions = "auto"``, repetitions are added in batches of 
+    ``chunk_size`` until the standard error of every average ``tau`` value 
+    (of every turtle/subject and step) falls below ``precision`` (or 
+    ``max_repetitions`` is reached). The number of repetitions actually run
+    is recorded in ``settings.repetitions``, and the largest standard error 
+    achieved in ``settings.standard_error``.
+    
+    With ``n_cycles = "auto"``, the number of cycles is chosen by running a 
+    pilot batch of ``chunk_size`` repetitions one cycle at a time, until the 
+    largest change in the mean ``tau`` of the same exposure between two 
+    consecutive cycles falls below ``tolerance`` (or ``max_cycles`` is 
+    reached). The number of cycles actually run is recorded in 
+    ``settings.n_cycles``.
+    
+    Every step of every cycle is kept, indexed by its ``(cycle, label)`` pair
+    (e.g., ``model.tau("winter", cycle = 2)``). Use ``record`` to keep only
+    some steps in the result: step numbers, labels (e.g., ``"spring"``, for 
+    all cycles) or ``(cycle, label)`` pairs (e.g., ``[(3, "spring")]``). Steps
+    that are not recorded are still simulated, but are not stored or 
+    averaged.
+    
+    The ``tau`` and ``k`` values of the turtles are drawn all at once from
+    normal distributions, either clipped (``truncation = "clip"``) or 
+    truncated (``truncation = "truncnorm"``) to ``tau_range`` and ``k_range``.
+    
+    Repetitions are averaged with running (Welford) accumulators: each 
+    repetition is folded into the per-exposure means as soon as it finishes 
+    and then dropped, so peak memory does not grow with ``repetitions``. The
+    per-turtle sample variance of ``tau`` across repetitions is returned in
+    ``variance`` (``None`` when ``repetitions = 0``).
+    
+    The model is returned as a columnar ``ModelResult`` object, holding the 
+    ``tau`` values of every exposure in a single ``(exposures, n)`` array 
+    (see ``model.tau(exposure)``). ``model.turtles`` still gives the ``Box`` 
+    interface of previous versions.
+    
+    All random draws come from generators spawned from 
+    ``np.random.SeedSequence(seed)``, using the NumPy ``bit_generator`` of 
+    choice (e.g., ``"PCG64DXSM"`` or ``"Philox"``). The seed entropy and 
+    spawn key are recorded in ``settings.seed`` and ``settings.spawn_key``,
+    so any run can be reproduced with ``seed = np.random.SeedSequence(
+    settings.seed, spawn_key = settings.spawn_key)``. Set 
+    ``workers`` to spread the batches of the array engine across a process 
+    pool. Each batch has its own generator, making the results reproducible 
+    for any number of workers. The pool processes are spawned and run Numba
+    kernels on a single thread (see ``get_executor()``), so scripts using 
+    ``workers`` need an ``if __name__ == "__main__":`` guard.
+    
     :Example:
     
     >>> model = entrainment.run_model(
@@ -30,46 +99,103 @@ def run_model(
         n_cycles = 3, repetitions = 10**2
         )
     """
+    seed = get_seed_sequence(seed)
+    turtles_seed, entrain_seed = seed.spawn(2)
+    backend = get_backend(backend)
+    
     cli_progress_step("! Creating turtles", show_progress)
     
-    turtles_0 = create_turtles(
-        n, tau_range, tau_mean, tau_sd, k_range, k_mean, k_sd
+    tau_0, k = create_turtles_array(
+        n, tau_range, tau_mean, tau_sd, k_range, k_mean, k_sd,
+        rng = get_rng(turtles_seed, bit_generator), truncation = truncation
+        )
+    
+    if n_cycles == "auto":
+        cli_progress_step("! Finding the number of cycles", show_progress)
+        
+        n_cycles = get_n_cycles(
+            tau_0, k, lam_c, labren_id = labren_id, by = by, 
+            start_at = start_at, tolerance = tolerance, 
+            max_cycles = max_cycles, size = chunk_size, 
+            rng = get_rng(seed.spawn(1)[0], bit_generator), backend = backend
+            )
+    
+    exposures = get_exposures(
+        labren_id, by = by, n_cycles = n_cycles, start_at = start_at
         )
+    steps = get_exposure_steps(exposures[0])
+    rows = get_record_steps(steps, record)
     
     cli_progress_step("! Entraining turtles", show_progress)
-
-    if repetitions == 0:
-        turtles = cycle_turtles(
-            turtles_0, lam_c, labren_id = labren_id, by = by, 
-            n_cycles = n_cycles, start_at = start_at
+    
+    if engine == "box": turtles_0 = array_to_turtles(tau_0, k)
+    
+    if engine == "array":
+        turtles, variance, repetitions = run_turtles_array(
+            tau_0, k, lam_c, labren_id = labren_id, by = by, 
+            n_cycles = n_cycles, start_at = start_at, 
+            repetitions = repetitions, chunk_size = chunk_size, 
+            workers = workers, seed = entrain_seed,
+            bit_generator = bit_generator, show_progress = show_progress,
+            exposures = exposures, backend = backend, record = rows,
+            precision = precision, max_repetitions = max_repetitions
             )
+    elif not engine == "box":
+        raise ValueError("'engine' must be \"array\" or \"box\".")
+    elif repetitions == 0:
+        turtles = turtles_to_array(cycle_turtles(
+            turtles_0, lam_c, labren_id = labren_id, by = by, 
+            n_cycles = n_cycles, start_at = start_at, 
+            rng = get_rng(entrain_seed, bit_generator)
+            ), rows)
+        variance = None
     else:
-        turtles_n = Box()
+        rng = get_rng(entrain_seed, bit_generator)
+        count = max_repetitions if repetitions == "auto" else repetitions
+        turtles_stats = None
         
         with alive_bar(
-            repetitions, title = "- Repeating model", force_tty = True,
+            count, title = "- Repeating model", force_tty = True,
             length = 10, disable = not show_progress
             ) as bar:
-            for i in range(repetitions):
-                turtles_n["r_" + str(i + 1)] = cycle_turtles(
+            for i in range(count):
+                turtles_i = cycle_turtles(
                     turtles_0, lam_c, labren_id = labren_id, by = by, 
-                    n_cycles = n_cycles, start_at = start_at
+                    n_cycles = n_cycles, start_at = start_at, rng = rng
+                    )
+                turtles_stats = update_turtles_stats(
+                    turtles_stats, 
+                    turtles_to_array(turtles_i, rows)[:, np.newaxis]
                     )
                 bar()
+                
+                if repetitions == "auto" and get_standard_error(
+                    finish_turtles_stats(turtles_stats)[1], turtles_stats.count
+                    ) < precision:
+                    break
         
-        turtles = average_turtles(turtles_n)
+        turtles, variance = finish_turtles_stats(turtles_stats)
+        repetitions = turtles_stats.count
     
-    out = Box(
-        turtles = Box(turtles, frozen_box = True), 
+    standard_error = get_standard_error(variance, repetitions)
+    if np.isinf(standard_error): standard_error = None
+
+    out = ModelResult(
+        tau = turtles, k = k, exposures = [steps[i][1] for i in rows], 
+        cycles = [steps[i][0] for i in rows], variance = variance,
         settings = Box(
             n = n, tau_range = tau_range, tau_mean = tau_mean, tau_sd = tau_sd,
             k_range = k_range, k_mean = k_mean, k_sd = k_sd, lam_c = lam_c,
             labren_id = labren_id, by = by, n_cycles = n_cycles,
-            start_at = start_at, repetitions = repetitions, 
-            frozen_box = True
-            ),
-            frozen_box = True
+            start_at = start_at, repetitions = repetitions, engine = engine,
+            chunk_size = chunk_size, workers = workers, seed = seed.entropy,
+            spawn_key = seed.spawn_key, bit_generator = bit_generator, 
+            truncation = truncation, backend = backend, record = record, 
+            tolerance = tolerance, max_cycles = max_cycles, 
+            precision = precision, max_repetitions = max_repetitions, 
+            standard_error = standard_error, frozen_box = True
             )
+        )
     
     if plot == True:
         cli_progress_step("! Plotting turtles", show_progress)
@@ -79,29 +205,60 @@ def run_model(
 
 def create_turtles(
     n = 10, tau_range = (23.5, 24.6), tau_mean = 24.15, tau_sd = 0.2, 
-    k_range = (0.001, 0.01), k_mean = 0.001, k_sd = 0.005
+    k_range = (0.001, 0.01), k_mean = 0.001, k_sd = 0.005, rng = None,
+    truncation = "clip"
     ):
     """Create turtles/subjects for the entrainment model."""
-    out = []
+    return array_to_turtles(*create_turtles_array(
+        n, tau_range, tau_mean, tau_sd, k_range, k_mean, k_sd, rng = rng, 
+        truncation = truncation
+        ))
+
+def create_turtles_array(
+    n = 10, tau_range = (23.5, 24.6), tau_mean = 24.15, tau_sd = 0.2, 
+    k_range = (0.001, 0.01), k_mean = 0.001, k_sd = 0.005, rng = None,
+    truncation = "clip"
+    ):
+    """Create turtles/subjects as ``tau`` and ``k`` NumPy arrays.
     
-    for i in range(n):
-        tau = np.random.normal(tau_mean, tau_sd)
-        k = np.random.normal(k_mean, k_sd)
-        
-        if (tau < tau_range[0]): tau = tau_range[0]
-        if (tau > tau_range[1]): tau = tau_range[1]
-        if (k < k_range[0]): k = k_range[0]
-        if (k > k_range[1]): k = k_range[1]
-        
-        out.append(Box(tau = tau, k = k, frozen_box = True))
+    All ``n`` values are drawn at once. With ``truncation = "clip"``, values 
+    drawn from the normal distributions outside ``tau_range``/``k_range`` are 
+    moved to the nearest limit (which piles mass on the limits). With 
+    ``truncation = "truncnorm"``, the values are drawn from truncated normal 
+    distributions (``scipy.stats.truncnorm``) instead.
+    """
+    if rng == None: rng = np.random
     
-    return tuple(out)
+    if truncation == "clip":
+        tau = np.clip(rng.normal(tau_mean, tau_sd, size = n), *tau_range)
+        k = np.clip(rng.normal(k_mean, k_sd, size = n), *k_range)
+    elif truncation == "truncnorm":
+        tau = truncnorm_sample(n, tau_range, tau_mean, tau_sd, rng)
+        k = truncnorm_sample(n, k_range, k_mean, k_sd, rng)
+    else:
+        raise ValueError("'truncation' must be \"clip\" or \"truncnorm\".")
+    
+    return tau, k
+
+def truncnorm_sample(n, range, mean, sd, rng = None):
+    """Draw ``n`` values from a normal distribution truncated to ``range``."""
+    a, b = (range[0] - mean) / sd, (range[1] - mean) / sd
+    
+    return stats.truncnorm.rvs(
+        a, b, loc = mean, scale = sd, size = n, random_state = rng
+        )
 
-def entrain(tau, k, lam, lam_c, tau_ref = 24):
-    """Compute the (un)entrainment function."""
-    logi_f = (tau_ref - tau) / (1 + np.exp(1) ** (- k * (lam - lam_c)))
+def entrain(tau, k, lam, lam_c, tau_ref = 24, u = None):
+    """Compute the (un)entrainment function.
+    
+    ``u`` is the uniform draw used for the error term. If not given, it is 
+    drawn from the global ``np.random`` state.
+    """
+    if u == None: u = np.random.uniform(low = 0, high = 1)
+    
+    logi_f = (tau_ref - tau) * special.expit(k * (lam - lam_c))
     out = tau + logi_f
-    error = np.random.uniform(low = 0, high = 1) * np.abs(out - tau)
+    error = u * np.abs(out - tau)
     
     if out >= tau:
         out = out - error
@@ -110,9 +267,12 @@ def entrain(tau, k, lam, lam_c, tau_ref = 24):
     
     return out
 
-def entrain_turtles(turtles, turtles_0, lam, lam_c):
+def entrain_turtles(turtles, turtles_0, lam, lam_c, rng = None):
     """Entrain turtles/subjects."""
+    if rng == None: rng = np.random
+    
     out = []
+    u = rng.uniform(low = 0, high = 1, size = len(turtles))
     
     for i in range(len(turtles)):
         tau_0 = turtles_0[i].tau
@@ -120,32 +280,51 @@ def entrain_turtles(turtles, turtles_0, lam, lam_c):
         k = turtles[i].k
         
         if (lam >= lam_c):
-            tau_i = entrain(tau, k, lam, lam_c, tau_ref = 24)
+            tau_i = entrain(tau, k, lam, lam_c, tau_ref = 24, u = u[i])
         else:
-            tau_i = entrain(tau, k, lam, lam_c, tau_ref = tau_0)
+            tau_i = entrain(tau, k, lam, lam_c, tau_ref = tau_0, u = u[i])
         
         out.append(Box(tau = tau_i, k = k, frozen_box = True))
     
     return tuple(out)
 
 def cycle_turtles(
-    turtles_0, lam_c, labren_id = 1, by = "season", n_cycles = 3, start_at = 0
+    turtles_0, lam_c, labren_id = 1, by = "season", n_cycles = 3, start_at = 0,
+    rng = None
     ):
+    """Cycle turtles/subjects.
+    
+    Returns a tuple with the turtles/subjects of each model step, starting 
+    with the unentrained turtles (see ``get_exposure_steps()``). Each step 
+    entrains the turtles of the previous step.
+    """
+    labels, labren_data = get_exposures(
+        labren_id, by = by, n_cycles = n_cycles, start_at = start_at
+        )
+    
+    out = [turtles_0]
+    
+    for i in range(len(labels)):
+        out.append(entrain_turtles(
+            out[i], turtles_0, labren_data[i], lam_c, rng = rng
+            ))
+    
+    return tuple(out)
+
+def get_exposures(labren_id = 1, by = "season", n_cycles = 3, start_at = 0):
+    """Get the exposure labels and irradiation values of each model step."""
     if by == "month":
         labels = [
             "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", 
             "Oct", "Nov", "Dec"
             ]
         labren_data = list(get_labren_data(labren_id, by = "month")["ts"])
-        cycle = 12
     elif by == "season":
         labels = ["Summer", "Autumn", "Winter", "Spring"]
         labren_data = list(get_labren_data(labren_id, by = "season")["ts"])
-        cycle = 4
     else:
         labels = ["Annual"]
         labren_data = [get_labren_data(labren_id, by = "year")["ts"]]
-        cycle = 1
     
     if not by == "year":
         labels = reorder(labels, start_at)
@@ -156,53 +335,474 @@ def cycle_turtles(
         [labels.extend(labels_0) for i in range(n_cycles - 1)]
         [labren_data.extend(labren_data_0) for i in range(n_cycles - 1)]
     
-    out = Box({"unentrained": turtles_0})
+    return labels, labren_data
+
+def get_n_cycles(
+    tau_0, k, lam_c, labren_id = 1, by = "season", start_at = 0, 
+    tolerance = 1e-3, max_cycles = 20, size = None, rng = None, 
+    backend = "numpy"
+    ):
+    """Find the number of cycles needed to reach a steady state.
+    
+    The turtles/subjects (``size`` repetitions of them) are cycled one cycle
+    at a time, until the largest absolute change in the mean ``tau`` of the
+    same exposure between two consecutive cycles falls below ``tolerance``.
+    Returns the number of cycles run (at most ``max_cycles``).
+    """
+    exposures = get_exposures(
+        labren_id, by = by, n_cycles = 1, start_at = start_at
+        )
+    sigmoid = get_sigmoid_table(k, exposures[1], lam_c)
+    tau, mean_0 = None, None
+    
+    for i in range(1, max_cycles + 1):
+        turtles = cycle_turtles_array(
+            tau_0, k, lam_c, size = size, rng = rng, exposures = exposures, 
+            sigmoid = sigmoid, backend = backend, start = tau
+            )[1:]
+        mean = np.mean(turtles.reshape(len(turtles), -1), axis = 1)
         
-    for i in range(cycle * n_cycles):
-        exposure = list(out)[-1]
-        lam = labren_data[i]
-        turtles_i = entrain_turtles(
-            out[exposure], turtles_0, lam, lam_c
-            )
+        if (not mean_0 is None) and np.max(np.abs(mean - mean_0)) < tolerance:
+            return i
         
-        out[labels[i].lower()] = turtles_i
+        tau, mean_0 = turtles[-1], mean
     
-    return Box(out, frozen_box = True)
+    return max_cycles
 
-def average_turtles(turtles_n):
-    """Average turtles/subjects values after n repetitions."""
-    n = len(turtles_n)
-    keys = list(turtles_n.r_1)[1::]
-    out = Box({"unentrained": turtles_n.r_1.unentrained})
+def get_exposure_steps(labels):
+    """Get the ``(cycle, label)`` pair of each model step.
     
-    for i in keys: # i = 0 => "unentrained"
-        turtles_i = []
-        
-        ## Group all turtles from exposure 'i' in 'turtles_i' (each repetition)
-        for a, b in enumerate(turtles_n): # a = 0 => b = "r_1"
-            turtles_i.append(turtles_n[b][i])
-        
-        ## Separate 'tau' and 'k' value from each repetition
-        tau_i, k_i = [], []
-        
-        for a in range(len(turtles_i)):
-            tau_i.append([b["tau"] for b in np.array(turtles_i[a])])
-            k_i.append([b["k"] for b in np.array(turtles_i[a])])
-        
-        ## Average 'tau' and 'k' values
-        tau_i = functools.reduce(lambda x, y: np.array(x) + np.array(y), 
-                                 tau_i) / n
-        k_i = functools.reduce(lambda x, y: np.array(x) + np.array(y), 
-                               k_i) / n
-        
-        ## Store the average turtles from exposure 'i' in 'out'
-        turtles_i = []
+    ``labels`` are the exposure labels returned by ``get_exposures()``. Step 
+    ``0`` holds the unentrained turtles (``(0, "unentrained")``) and step 
+    ``i`` the turtles after the ``i``-th exposure.
+    """
+    n = len(set(labels))
+    
+    return [(0, "unentrained")] + [
+        (i // n + 1, j.lower()) for i, j in enumerate(labels)
+        ]
+
+def get_record_steps(steps, record = None):
+    """Get the (sorted) step numbers selected by ``record``.
+    
+    ``steps`` are the ``(cycle, label)`` pairs returned by 
+    ``get_exposure_steps()``. ``record`` can hold step numbers, labels (which
+    select the steps of all cycles) or ``(cycle, label)`` pairs. A single 
+    step number, label or pair is also accepted. If ``record`` is ``None``, 
+    all steps are selected.
+    """
+    if record is None: return list(range(len(steps)))
+    
+    if isinstance(record, (str, int, np.integer)) or (
+        isinstance(record, tuple) and len(record) == 2 and 
+        isinstance(record[1], str)
+        ):
+        record = [record]
+    
+    out = set()
+    
+    for i in record:
+        if isinstance(i, (int, np.integer)):
+            if not 0 <= i < len(steps):
+                raise ValueError("Step {i} is out of range.".format(i = i))
+            
+            out.add(int(i))
+        elif isinstance(i, str):
+            out.update(j for j, l in enumerate(steps) if l[1] == i.lower())
+        else:
+            out.add(steps.index((i[0], i[1].lower())))
+    
+    if len(out) == 0: raise ValueError("'record' does not match any step.")
+    
+    return sorted(out)
+
+def run_turtles_array(
+    tau_0, k, lam_c, labren_id = 1, by = "season", n_cycles = 3, 
+    start_at = 0, repetitions = 10**2, chunk_size = 10, workers = None,
+    seed = None, bit_generator = "PCG64", show_progress = True,
+    exposures = None, backend = "numpy", record = None, precision = 0.01,
+    max_repetitions = 10**3
+    ):
+    """Entrain and average turtles/subjects using the array engine.
+    
+    Repetitions are simulated in batches of ``chunk_size`` as 
+    ``(chunk_size, n)`` arrays, so each exposure step of a batch costs the 
+    same number of Python-level operations as a single repetition. Each batch
+    is folded into running means and variances as soon as it finishes, 
+    bounding memory use by ``chunk_size``. The results are ``(steps, n)`` 
+    arrays (see ``cycle_turtles_array()``).
+    
+    Each batch draws from its own generator, spawned from 
+    ``np.random.SeedSequence(seed)``, and the partial statistics are merged in
+    batch order. If ``workers`` is given, the batches are spread across a 
+    process pool with identical results for any number of workers.
+    
+    With ``repetitions = "auto"``, batches are added until the standard error
+    of every average ``tau`` value falls below ``precision`` (see 
+    ``get_standard_error()``), up to ``max_repetitions``. The stopping rule is
+    checked after each batch, in batch order, so the results still do not 
+    depend on ``workers``. Returns the average ``tau`` values, their variances
+    and the number of repetitions run.
+    
+    The exposure labels and irradiation values (see ``get_exposures()``) are 
+    computed only once, unless they are given in ``exposures``. The same goes
+    for the logistic factors of the turtles (see ``get_sigmoid_table()``), 
+    which are shared by all batches.
+    """
+    seed = get_seed_sequence(seed)
+    
+    if exposures == None:
+        exposures = get_exposures(
+            labren_id, by = by, n_cycles = n_cycles, start_at = start_at
+            )
+    
+    sigmoid = get_sigmoid_table(k, exposures[1], lam_c)
+    
+    if repetitions == 0:
+        turtles = cycle_turtles_array(
+            tau_0, k, lam_c, rng = get_rng(seed, bit_generator),
+            exposures = exposures, sigmoid = sigmoid, backend = backend, 
+            record = record
+            )
         
-        for a in range(len(tau_i)):
-            turtles_i.append(
-                Box(tau = tau_i[a], k = k_i[a], frozen_box = True)
+        return turtles, None, 0
+    
+    auto = repetitions == "auto"
+    count = max_repetitions if auto else repetitions
+    sizes = [
+        min(chunk_size, count - i) for i in range(0, count, chunk_size)
+        ]
+    seeds = seed.spawn(len(sizes))
+    turtles_stats, done = None, False
+    
+    with alive_bar(
+        count, title = "- Repeating model", force_tty = True,
+        length = 10, disable = not show_progress
+        ) as bar:
+        if workers == None:
+            for i, size in enumerate(sizes):
+                turtles_stats = merge_turtles_stats(
+                    turtles_stats, run_chunk_array(
+                        tau_0, k, lam_c, exposures, size, seeds[i], 
+                        bit_generator, sigmoid, backend, record
+                        )
+                    )
+                bar(size)
+                
+                if auto and get_standard_error(
+                    finish_turtles_stats(turtles_stats)[1], turtles_stats.count
+                    ) < precision:
+                    break
+        else:
+            ## With "auto", batches are submitted one round (of ``workers`` 
+            ## batches) at a time
+            step = workers if auto else len(sizes)
+            
+            with get_executor(workers) as executor:
+                for j in range(0, len(sizes), step):
+                    futures = {
+                        executor.submit(
+                            run_chunk_array, tau_0, k, lam_c, exposures, 
+                            sizes[i], seeds[i], bit_generator, sigmoid, 
+                            backend, record
+                            ): i
+                        for i in range(j, min(j + step, len(sizes)))
+                        }
+                    pending, next_i = {}, j
+                    
+                    ## Merge partial statistics in batch order 
+                    ## (reproducibility)
+                    for future in as_completed(futures):
+                        pending[futures[future]] = future.result()
+                        bar(sizes[futures[future]])
+                        
+                        while (not done) and next_i in pending:
+                            turtles_stats = merge_turtles_stats(
+                                turtles_stats, pending.pop(next_i)
+                                )
+                            next_i += 1
+                            done = auto and get_standard_error(
+                                finish_turtles_stats(turtles_stats)[1], 
+                                turtles_stats.count
+                                ) < precision
+                    
+                    if done: break
+    
+    return finish_turtles_stats(turtles_stats) + (turtles_stats.count, )
+
+def run_chunk_array(
+    tau_0, k, lam_c, exposures, size, seed = None, bit_generator = "PCG64",
+    sigmoid = None, backend = "numpy", record = None
+    ):
+    """Simulate a batch of repetitions and return its running statistics."""
+    turtles = cycle_turtles_array(
+        tau_0, k, lam_c, size = size, rng = get_rng(seed, bit_generator),
+        exposures = exposures, sigmoid = sigmoid, backend = backend, 
+        record = record
+        )
+    
+    return update_turtles_stats(None, turtles)
+
+def entrain_array(tau, k, lam, lam_c, tau_ref = 24, rng = None):
+    """Compute the (un)entrainment function for arrays of turtles/subjects.
+    
+    Vectorized version of ``entrain()``: ``tau``, ``k`` and ``tau_ref`` can be 
+    NumPy arrays, and one error value is drawn for each element from ``rng`` 
+    (default: the global ``np.random`` state).
+    """
+    sigmoid = special.expit(k * (lam - lam_c))
+    
+    return entrain_sigmoid_array(tau, tau_ref, sigmoid, rng = rng)
+
+def entrain_sigmoid_array(tau, tau_ref, sigmoid, rng = None, out = None):
+    """Compute the (un)entrainment function from precomputed logistic factors.
+    
+    The error term always pulls ``tau`` back towards its previous value, by a
+    fraction ``u`` of the logistic step. Hence, the branches of ``entrain()``
+    reduce to a single multiply-add, 
+    ``tau + (tau_ref - tau) * sigmoid * (1 - u)``. The result is written into
+    ``out``, if given (which can be ``tau`` itself).
+    """
+    if rng == None: rng = np.random
+    
+    shape = np.broadcast_shapes(np.shape(tau), np.shape(sigmoid))
+    step = rng.uniform(low = 0, high = 1, size = shape)
+    
+    np.subtract(1, step, out = step)
+    np.multiply(sigmoid, step, out = step)
+    np.multiply(np.subtract(tau_ref, tau), step, out = step)
+    
+    return np.add(tau, step, out = out)
+
+def entrain_turtles_array(tau, k, tau_0, lam, lam_c, rng = None):
+    """Entrain turtles/subjects stored as NumPy arrays.
+    
+    ``lam`` can also be an array (e.g., one value for each LABREN station), 
+    broadcastable against ``tau``.
+    """
+    tau_ref = np.where(lam >= lam_c, 24, tau_0)
+    
+    return entrain_array(tau, k, lam, lam_c, tau_ref = tau_ref, rng = rng)
+
+def cycle_turtles_array(
+    tau_0, k, lam_c, labren_id = 1, by = "season", n_cycles = 3, start_at = 0,
+    size = None, rng = None, exposures = None, sigmoid = None,
+    backend = "numpy", record = None, start = None
+    ):
+    """Cycle turtles/subjects stored as NumPy arrays.
+    
+    Array counterpart of ``cycle_turtles()``. It returns a ``(steps, n)`` 
+    array with the ``tau`` values of each model step (see 
+    ``get_exposure_steps()``). If ``size`` is given, ``size`` independent 
+    repetitions are cycled together and the array has the 
+    ``(steps, size, n)`` shape (``size`` can also be a tuple, e.g. 
+    ``(stations, repetitions)``).
+    
+    The steps are written in place into a single preallocated buffer. 
+    ``record`` can be used to keep only some steps (see 
+    ``get_record_steps()``). Steps that are not recorded share a single 
+    scratch array. By default, all steps are kept.
+    
+    ``start`` can be used to start from other ``tau`` values than ``tau_0`` 
+    (e.g., the last step of a previous cycle).
+    
+    ``exposures`` can be used to pass the ``(labels, labren_data)`` returned by
+    ``get_exposures()``, skipping the LABREN lookup, and ``sigmoid`` the table
+    returned by ``get_sigmoid_table()``, to reuse it across repetitions.
+    ``backend`` can be ``"numpy"`` or ``"numba"`` (see ``run_model()``).
+    """
+    if exposures == None:
+        exposures = get_exposures(
+            labren_id, by = by, n_cycles = n_cycles, start_at = start_at
+            )
+    
+    labels, labren_data = exposures
+    
+    if sigmoid == None: sigmoid = get_sigmoid_table(k, labren_data, lam_c)
+    
+    table, index, entrained = sigmoid
+    steps = get_exposure_steps(labels)
+    rows = get_record_steps(steps, record)
+    shape = tuple(np.append(size, len(tau_0))) if not size == None else None
+    shape = np.shape(tau_0) if shape == None else shape
+    
+    out = np.empty((len(rows), ) + shape)
+    
+    ## State of each step: a buffer row if recorded, else the scratch array
+    states = [None] * len(steps)
+    for i, j in enumerate(rows): states[j] = out[i]
+    
+    if len(rows) < len(steps): 
+        scratch = np.empty(shape)
+        states = [scratch if i is None else i for i in states]
+    
+    states[0][...] = tau_0 if start is None else start
+
+    if backend == "numba":
+        cycle_turtles_numba(states, tau_0, sigmoid, rng = rng)
+    else:
+        for i in range(len(labels)):
+            entrain_sigmoid_array(
+                states[i], np.where(entrained[index[i]], 24, tau_0), 
+                table[index[i]], rng = rng, out = states[i + 1]
                 )
+    
+    return out
+
+def cycle_turtles_numba(states, tau_0, sigmoid, rng = None):
+    """Cycle turtles/subjects stored as NumPy arrays with the Numba kernel.
+    
+    ``states`` holds the (preallocated) array of each step of 
+    ``cycle_turtles_array()``. The uniform draws of each step are written 
+    into a single reused buffer, so the results match the NumPy backend for 
+    the same generator.
+    """
+    if rng == None: rng = np.random.default_rng()
+    
+    kernel = get_entrain_kernel()
+    table, index, entrained = sigmoid
+    n = len(tau_0)
+    
+    ## The kernel works on (rows, n) arrays, where each block of rows shares 
+    ## one row of logistic factors (e.g., one for each LABREN station)
+    table = table.reshape(len(table), -1, n)
+    entrained = entrained.reshape(len(entrained), -1)
+    states = [i.reshape(-1, n) for i in states]
+    u = np.empty(states[0].shape)
+    
+    for i in range(len(states) - 1):
+        rng.random(out = u)
+        kernel(
+            states[i], tau_0, table[index[i]], entrained[index[i]], u, 
+            states[i + 1]
+            )
+    
+    return None
+
+@functools.lru_cache(maxsize = None)
+def get_entrain_kernel():
+    """Compile the Numba kernel of the entrainment step.
+    
+    The kernel fuses ``entrain_sigmoid_array()`` and the choice of
+    ``tau_ref`` into a single parallel loop over all the ``rows * n`` values,
+    writing the result into ``out``, so even a single row of turtles/subjects
+    uses all threads. The compiled kernel is cached on disk, so it is only 
+    compiled once (not once per process or ``workers`` process). Returns 
+    ``None`` if Numba is not installed.
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+    
+    @numba.njit(parallel = True, cache = True)
+    def kernel(tau, tau_0, sigmoid, entrained, u, out):
+        rows, n = tau.shape
+        block = rows // sigmoid.shape[0]
         
-        out[i] = tuple(turtles_i)
-        
-    return Box(out, frozen_box = True)
+        for m in numba.prange(rows * n):
+            i, l = m // n, m % n
+            j = i // block
+            tau_ref = 24.0 if entrained[j] else tau_0[l]
+            step = sigmoid[j, l] * (1 - u[i, l])
+            out[i, l] = tau[i, l] + (tau_ref - tau[i, l]) * step
+    
+    return kernel
+
+def get_backend(backend = "numpy"):
+    """Check the backend of the array engine.
+    
+    Falls back to ``"numpy"`` (with a warning) if ``backend = "numba"`` and
+    Numba is not installed.
+    """
+    if not backend in ["numpy", "numba"]:
+        raise ValueError("'backend' must be \"numpy\" or \"numba\".")
+    
+    if backend == "numba" and get_entrain_kernel() == None:
+        warnings.warn(
+            "Numba is not installed. Using the NumPy backend instead."
+            )
+        backend = "numpy"
+    
+    return backend
+
+def get_sigmoid_table(k, labren_data, lam_c):
+    """Precompute the logistic factors of the entrainment function.
+    
+    ``k`` never changes and the irradiation ``lam`` only takes a few distinct
+    values (one for each month or season), so the logistic factors 
+    ``expit(k * (lam - lam_c))`` are computed once for each distinct ``lam``.
+    ``labren_data`` holds the ``lam`` value of each step (or an array of 
+    values, e.g. one for each LABREN station, broadcastable against the 
+    turtles).
+    
+    Returns a ``(table, index, entrained)`` tuple, where ``table[index[i]]`` 
+    holds the factors of step ``i`` and ``entrained[index[i]]`` tells whether 
+    ``lam >= lam_c`` (i.e., whether ``tau_ref`` is 24).
+    """
+    lam = np.asarray(labren_data, dtype = float)
+    if lam.ndim == 1: lam = lam[:, np.newaxis]
+    
+    lam, index = np.unique(lam, axis = 0, return_inverse = True)
+    table = special.expit(k * (lam - lam_c))
+    
+    return table, index.ravel(), lam >= lam_c
+
+def update_turtles_stats(stats, turtles):
+    """Fold a batch of repetitions into running means and variances.
+    
+    ``turtles`` is a ``(steps, ..., repetitions, n)`` array of ``tau`` 
+    values.
+    """
+    mean = np.mean(turtles, axis = -2)
+    stats_i = Box(
+        count = turtles.shape[-2], mean = mean,
+        m_2 = np.sum((turtles - np.expand_dims(mean, -2)) ** 2, axis = -2)
+        )
+    
+    return merge_turtles_stats(stats, stats_i)
+
+def merge_turtles_stats(stats, stats_i):
+    """Merge two sets of running means and variances.
+    
+    This uses the parallel variant of Welford's algorithm (Chan et al., 1983).
+    """
+    if stats == None: return stats_i
+    
+    count = stats.count + stats_i.count
+    delta = stats_i.mean - stats.mean
+    
+    stats.mean = stats.mean + delta * (stats_i.count / count)
+    stats.m_2 = stats.m_2 + stats_i.m_2 + delta ** 2 * \
+        (stats.count * stats_i.count / count)
+    stats.count = count
+    
+    return stats
+
+def finish_turtles_stats(stats):
+    """Get the average ``tau`` values and variances from running statistics."""
+    if stats.count > 1:
+        variance = stats.m_2 / (stats.count - 1)
+    else:
+        variance = np.zeros(np.shape(stats.mean))
+    
+    return stats.mean, variance
+
+def get_standard_error(variance, count):
+    """Get the largest standard error of the average ``tau`` values.
+    
+    ``variance`` holds the variances of ``tau`` across ``count`` 
+    repetitions. Returns ``np.inf`` if there are less than 2 repetitions.
+    """
+    if variance is None or count < 2: return np.inf
+    
+    return float(np.sqrt(np.max(variance) / count))
+
+def turtles_to_array(turtles, rows = None):
+    """Convert the steps of ``cycle_turtles()`` to a ``(steps, n)`` array.
+    
+    If ``rows`` is given, only the steps in it are converted.
+    """
+    if rows == None: rows = range(len(turtles))
+    
+    return np.array([[j.tau for j in turtles[i]] for i in rows])
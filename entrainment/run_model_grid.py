@@ -0,0 +1,306 @@
+import inspect
+import itertools
+import numpy as np
+import os
+import pandas as pd
+from concurrent.futures import as_completed
+from .run_model import run_model, create_turtles_array, get_exposures
+from .run_model import get_backend, get_exposure_steps, get_n_cycles
+from .run_model import get_record_steps, get_standard_error
+from .run_model import run_turtles_array
+from .run_model_sweep import summarize_turtles
+from .utils import cli_progress_step, get_executor, get_rng
+from .utils import get_seed_sequence
+from alive_progress import alive_bar
+from scipy.stats import qmc
+
+def run_model_grid(
+    grid, method = "grid", samples = 10, workers = None, seed = None,
+    bit_generator = "PCG64", path = None, show_progress = True, **kwargs
+    ):
+    """Compute the entrainment model over a grid of parameters.
+    
+    ``grid`` is a ``dict`` mapping ``run_model()`` arguments (e.g., ``lam_c``,
+    ``tau_mean``, ``tau_sd``, ``k_mean``, ``k_sd``, ``n_cycles``) to the values
+    to explore. With ``method = "grid"``, every combination of the given
+    values is computed. With ``method = "lhs"``, each argument must be mapped
+    to a ``(low, high)`` interval, from which ``samples`` points are drawn
+    with a Latin hypercube design. Any other ``run_model()`` argument can be
+    fixed through ``**kwargs``.
+    
+    Points that share the same population arguments (``n``, ``tau_range``,
+    ``tau_mean``, ``tau_sd``, ``k_range``, ``k_mean``, ``k_sd`` and 
+    ``truncation``) share the same ``turtles_0``, which are created only once
+    and drawn from the same seed (common random numbers). Each point has its
+    own generator, spawned from ``np.random.SeedSequence(seed)``. Set 
+    ``workers`` to spread the points across a process pool. With 
+    ``n_cycles = "auto"``, the number of cycles is found for each point, as 
+    ``run_model()`` does.
+    
+    The result is a tidy ``pandas.DataFrame`` with one row for each point and
+    model step, holding summary statistics of the average ``tau`` values of the
+    turtles/subjects, the ``repetitions`` run and the largest 
+    ``standard_error`` reached (see ``run_model()``), and the ``seed`` 
+    (entropy and ``spawn_key``) of the grid. If ``path`` is given, the rows of each point are appended to a CSV
+    file as soon as it finishes. Running the same call again resumes the 
+    sweep, reusing the seed stored in the file (so ``seed = None`` is safe) 
+    and skipping the points already in it. A ``ValueError`` is raised if the
+    stored seed or points do not match the call.
+    
+    :Example:
+    
+    >>> grid = entrainment.run_model_grid(
+        grid = {"lam_c": [3000, 3750, 4500], "tau_sd": [0.1, 0.2]},
+        n = 10**3, labren_id = 1, by = "season", repetitions = 10**2
+        )
+    
+    >>> grid = entrainment.run_model_grid(
+        grid = {"lam_c": (3000, 4500), "k_mean": (0.001, 0.01)},
+        method = "lhs", samples = 50, path = "grid.csv"
+        )
+    """
+    settings = inspect.signature(run_model).parameters
+    settings = {i: settings[i].default for i in settings}
+    settings.update(kwargs)
+    settings["backend"] = get_backend(settings["backend"])
+    
+    if (not path == None) and os.path.isfile(path):
+        stored = pd.read_csv(path)
+        seed = get_stored_seed(stored, seed)
+    else:
+        stored = None
+    
+    seed = get_seed_sequence(seed)
+    turtles_seed, entrain_seed, grid_seed = seed.spawn(3)
+    points = get_grid_points(grid, method, samples, seed = grid_seed)
+    seeds = entrain_seed.spawn(len(points))
+    
+    if stored is None:
+        done = set()
+    else:
+        done = check_grid_points(stored, points)
+    
+    cli_progress_step("! Creating turtles", show_progress)
+    
+    population = [
+        "n", "tau_range", "tau_mean", "tau_sd", "k_range", "k_mean", "k_sd",
+        "truncation"
+        ]
+    environment = ["labren_id", "by", "n_cycles", "start_at"]
+    turtles, exposures = {}, {}
+    args = []
+    
+    for i, point in enumerate(points):
+        if i in done: continue
+        
+        settings_i = dict(settings, **point)
+        key = tuple(settings_i[j] for j in population)
+        
+        if not key in turtles:
+            turtles[key] = create_turtles_array(
+                *[settings_i[j] for j in population[:-1]],
+                rng = get_rng(turtles_seed, bit_generator), 
+                truncation = settings_i["truncation"]
+                )
+        
+        key_i = tuple(settings_i[j] for j in environment)
+        
+        ## With "auto", the exposures depend on the point (see run_grid_point)
+        if settings_i["n_cycles"] == "auto":
+            exposures[key_i] = None
+        elif not key_i in exposures:
+            exposures[key_i] = get_exposures(*key_i)
+        
+        args.append((
+            i, point, settings_i, *turtles[key], exposures[key_i], seeds[i], 
+            bit_generator
+            ))
+    
+    cli_progress_step("! Computing grid points", show_progress)
+    
+    out = []
+    
+    with alive_bar(
+        len(args), title = "- Computing points", force_tty = True,
+        length = 10, disable = not show_progress
+        ) as bar:
+        if workers == None:
+            for i in args:
+                store_grid_point(out, run_grid_point(*i), seed, path)
+                bar()
+        else:
+            with get_executor(workers) as executor:
+                futures = [executor.submit(run_grid_point, *i) for i in args]
+                
+                for future in as_completed(futures):
+                    store_grid_point(out, future.result(), seed, path)
+                    bar()
+    
+    if not path == None: out = [pd.read_csv(path)]
+    
+    if len(out) == 0: return None
+    
+    out = pd.concat(out, ignore_index = True)
+    
+    return out.sort_values("point", kind = "stable", ignore_index = True)
+
+def get_grid_points(grid, method = "grid", samples = 10, seed = None):
+    """Get the parameter combinations (points) of a grid.
+    
+    Integer arguments of ``run_model()`` (e.g., ``n_cycles``) are rounded when
+    sampled with ``method = "lhs"``.
+    """
+    keys = list(grid)
+    
+    if method == "grid":
+        values = itertools.product(*[grid[i] for i in keys])
+        
+        return [dict(zip(keys, i)) for i in values]
+    elif not method == "lhs":
+        raise ValueError("'method' must be \"grid\" or \"lhs\".")
+    
+    bounds = np.array([grid[i] for i in keys], dtype = float)
+    sample = qmc.LatinHypercube(
+        d = len(keys), seed = np.random.default_rng(seed)
+        ).random(samples)
+    sample = qmc.scale(sample, bounds[:, 0], bounds[:, 1])
+    integers = [
+        "n", "labren_id", "n_cycles", "start_at", "repetitions", "chunk_size"
+        ]
+    out = []
+    
+    for i in sample:
+        point = {}
+        
+        for j, k in enumerate(keys):
+            if k in integers:
+                point[k] = int(round(i[j]))
+            else:
+                point[k] = float(i[j])
+        
+        out.append(point)
+    
+    return out
+
+def run_grid_point(
+    i, point, settings, tau_0, k, exposures, seed, bit_generator = "PCG64"
+    ):
+    """Compute a grid point and summarize its exposures.
+    
+    If ``exposures`` is ``None`` (``n_cycles = "auto"``), the number of cycles
+    of the point is found first with ``get_n_cycles()``.
+    """
+    if exposures is None:
+        seed, cycles_seed = get_seed_sequence(seed).spawn(2)
+        n_cycles = get_n_cycles(
+            tau_0, k, settings["lam_c"], labren_id = settings["labren_id"], 
+            by = settings["by"], start_at = settings["start_at"], 
+            tolerance = settings["tolerance"], 
+            max_cycles = settings["max_cycles"], size = settings["chunk_size"],
+            rng = get_rng(cycles_seed, bit_generator), 
+            backend = settings["backend"]
+            )
+        exposures = get_exposures(
+            settings["labren_id"], by = settings["by"], n_cycles = n_cycles, 
+            start_at = settings["start_at"]
+            )
+    
+    steps = get_exposure_steps(exposures[0])
+    rows = get_record_steps(steps, settings["record"])
+    turtles, variance, repetitions = run_turtles_array(
+        tau_0, k, settings["lam_c"], repetitions = settings["repetitions"],
+        chunk_size = settings["chunk_size"], seed = seed, 
+        bit_generator = bit_generator, show_progress = False,
+        exposures = exposures, backend = settings["backend"], record = rows,
+        precision = settings["precision"], 
+        max_repetitions = settings["max_repetitions"]
+        )
+    out = summarize_turtles(turtles, [steps[i] for i in rows])
+    standard_error = get_standard_error(variance, repetitions)
+    
+    out.insert(0, "point", i)
+    for j, key in enumerate(point): out.insert(j + 1, key, point[key])
+    
+    out["repetitions"] = repetitions
+    out["standard_error"] = \
+        np.nan if np.isinf(standard_error) else standard_error
+    
+    return out
+
+def get_stored_seed(stored, seed = None):
+    """Get the seed of the grid points stored in a CSV file.
+    
+    ``stored`` is the table read from the file. If ``seed`` is given, it must
+    match the stored seed.
+    """
+    if not "seed" in stored:
+        if seed == None:
+            raise ValueError(
+                "'path' has no 'seed' column. Pass the 'seed' used to " +
+                "compute its points to resume the sweep."
+                )
+        
+        return seed
+    
+    spawn_key = stored["spawn_key"].iloc[0]
+    spawn_key = () if pd.isna(spawn_key) else str(spawn_key).split()
+    out = np.random.SeedSequence(
+        int(stored["seed"].iloc[0]), spawn_key = [int(i) for i in spawn_key]
+        )
+    
+    if not seed == None:
+        seed = get_seed_sequence(seed)
+        
+        if not (seed.entropy, seed.spawn_key) == (out.entropy, out.spawn_key):
+            raise ValueError(
+                "'seed' does not match the seed of the points in 'path'."
+                )
+    
+    return out
+
+def check_grid_points(stored, points):
+    """Check the grid points stored in a CSV file and get their indexes.
+    
+    Raises a ``ValueError`` if the parameters of a stored point differ from
+    the ones in ``points``.
+    """
+    out = set()
+    
+    for i, rows in stored.groupby("point"):
+        if i >= len(points) or not all(
+            (j in rows) and is_same_value(rows[j].iloc[0], points[i][j])
+            for j in points[i]
+            ):
+            raise ValueError(
+                ("Point {} of 'path' does not match the grid. Use another " +
+                 "'path' to compute a different grid.").format(i)
+                )
+        
+        out.add(i)
+    
+    return out
+
+def is_same_value(x, y):
+    """Compare a value read from a CSV file with a parameter value."""
+    try:
+        return bool(np.isclose(float(x), float(y)))
+    except (TypeError, ValueError):
+        return str(x) == str(y)
+
+def store_grid_point(out, point, seed, path = None):
+    """Keep a grid point in ``out`` or append it to ``path``.
+    
+    The ``seed`` entropy and spawn key are added to the rows, so the sweep 
+    can be resumed (see ``get_stored_seed()``).
+    """
+    point.insert(1, "seed", str(seed.entropy))
+    point.insert(2, "spawn_key", " ".join(str(i) for i in seed.spawn_key))
+    
+    if path == None:
+        out.append(point)
+    else:
+        point.to_csv(
+            path, mode = "a", header = not os.path.isfile(path), index = False
+            )
+    
+    return None
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import as_completed
+from .get_labren_data import get_labren_index, load_labren_data
+from .run_model import create_turtles_array, cycle_turtles_array, get_exposures
+from .run_model import get_exposure_steps, get_record_steps, get_sigmoid_table
+from .run_model import update_turtles_stats
+from .utils import cli_progress_step, get_executor, get_rng
+from .utils import get_seed_sequence
+from alive_progress import alive_bar
+from box import Box
+
+def run_model_sweep(
+    labren_ids = None, n = 10**3, tau_range = (23.5, 24.6), tau_mean = 24.15,
+    tau_sd = 0.2, k_range = (0.001, 0.01), k_mean = 0.001, k_sd = 0.005,
+    lam_c = 3750, by = "season", n_cycles = 3, start_at = 0,
+    repetitions = 10**2, chunk_size = 10, station_chunk_size = 100,
+    workers = None, seed = None, bit_generator = "PCG64", truncation = "clip",
+    record = None, path = None, show_progress = True
+    ):
+    """Compute the entrainment model for many LABREN stations in one call.
+    
+    All stations share the same population of turtles/subjects. The stations
+    are simulated ``station_chunk_size`` at a time as a vectorized
+    ``(stations, repetitions, n)`` batch (with ``chunk_size`` repetitions per
+    batch). Set ``workers`` to spread the station chunks across a process
+    pool. Like ``run_model()``, all random draws come from generators spawned
+    from ``np.random.SeedSequence(seed)``, so results are reproducible for any
+    number of workers.
+    
+    The result is a tidy ``pandas.DataFrame`` with one row for each station
+    and model step (``cycle`` and ``exposure``), holding summary statistics 
+    of the average ``tau`` values of the turtles/subjects. Use ``record`` to 
+    keep only some steps (see ``run_model()``). If ``path`` is given, the 
+    rows are appended to a CSV file as each station chunk finishes (keeping 
+    memory use bounded) and ``None`` is returned.
+    
+    ``n_cycles`` must be an integer, since all stations share the same model 
+    steps. ``n_cycles = "auto"`` is not supported, but the number of cycles
+    of a station can be found with ``run_model(labren_id = ..., 
+    n_cycles = "auto").settings.n_cycles``. ``repetitions`` must also be an 
+    integer (``repetitions = "auto"`` is not supported).
+    
+    :Example:
+    
+    >>> sweep = entrainment.run_model_sweep(
+        labren_ids = range(1, 1001), n = 10**3, by = "season", lam_c = 3750,
+        n_cycles = 3, repetitions = 10**2
+        )
+    """
+    if not isinstance(n_cycles, (int, np.integer)):
+        raise ValueError(
+            "'n_cycles' must be an integer. Use 'run_model(n_cycles = " +
+            "\"auto\").settings.n_cycles' to choose it for a station."
+            )
+    
+    if not isinstance(repetitions, (int, np.integer)):
+        raise ValueError(
+            "'repetitions' must be an integer. 'run_model_sweep()' does " +
+            "not support \"auto\"."
+            )
+    
+    seed = get_seed_sequence(seed)
+    turtles_seed, entrain_seed = seed.spawn(2)
+    
+    if labren_ids is None: labren_ids = load_labren_data()["id"]
+    
+    labren_ids = [int(i) for i in labren_ids]
+    
+    cli_progress_step("! Creating turtles", show_progress)
+    
+    tau_0, k = create_turtles_array(
+        n, tau_range, tau_mean, tau_sd, k_range, k_mean, k_sd,
+        rng = get_rng(turtles_seed, bit_generator), truncation = truncation
+        )
+    
+    cli_progress_step("! Entraining turtles", show_progress)
+    
+    chunks = [
+        labren_ids[i:(i + station_chunk_size)]
+        for i in range(0, len(labren_ids), station_chunk_size)
+        ]
+    seeds = entrain_seed.spawn(len(chunks))
+    args = [
+        (tau_0, k, lam_c, i, by, n_cycles, start_at, repetitions, chunk_size,
+         seeds[j], bit_generator, record)
+        for j, i in enumerate(chunks)
+        ]
+    out = []
+    
+    with alive_bar(
+        len(labren_ids), title = "- Sweeping stations", force_tty = True,
+        length = 10, disable = not show_progress
+        ) as bar:
+        if workers == None:
+            for i in range(len(chunks)):
+                store_sweep_chunk(out, run_sweep_chunk(*args[i]), i, path)
+                bar(len(chunks[i]))
+        else:
+            pending, next_i = {}, 0
+            
+            with get_executor(workers) as executor:
+                futures = {
+                    executor.submit(run_sweep_chunk, *j): i
+                    for i, j in enumerate(args)
+                    }
+                
+                ## Write station chunks in order (reproducibility)
+                for future in as_completed(futures):
+                    pending[futures[future]] = future.result()
+                    bar(len(chunks[futures[future]]))
+                    
+                    while next_i in pending:
+                        chunk = pending.pop(next_i)
+                        store_sweep_chunk(out, chunk, next_i, path)
+                        next_i += 1
+    
+    if not path == None: return None
+    
+    out = pd.concat(out, ignore_index = True)
+    out.attrs["settings"] = Box(
+        n = n, tau_range = tau_range, tau_mean = tau_mean, tau_sd = tau_sd,
+        k_range = k_range, k_mean = k_mean, k_sd = k_sd, lam_c = lam_c,
+        by = by, n_cycles = n_cycles, start_at = start_at,
+        repetitions = repetitions, chunk_size = chunk_size,
+        station_chunk_size = station_chunk_size, workers = workers,
+        seed = seed.entropy, spawn_key = seed.spawn_key, 
+        bit_generator = bit_generator, truncation = truncation, 
+        record = record, frozen_box = True
+        )
+    
+    return out
+
+def run_sweep_chunk(
+    tau_0, k, lam_c, labren_ids, by, n_cycles, start_at, repetitions,
+    chunk_size, seed = None, bit_generator = "PCG64", record = None
+    ):
+    """Simulate a chunk of LABREN stations and summarize its exposures."""
+    rng = get_rng(seed, bit_generator)
+    labels = get_exposures(
+        labren_ids[0], by = by, n_cycles = n_cycles, start_at = start_at
+        )[0]
+    steps = get_exposure_steps(labels)
+    rows = get_record_steps(steps, record)
+    
+    ## Irradiation values as a (steps, stations, 1, 1) array, broadcastable
+    ## against the (stations, repetitions, n) turtles
+    labren_data = np.array([
+        get_exposures(i, by = by, n_cycles = n_cycles, start_at = start_at)[1]
+        for i in labren_ids
+        ]).T[:, :, np.newaxis, np.newaxis]
+    
+    sigmoid = get_sigmoid_table(k, labren_data, lam_c)
+    stats = None
+    
+    for i in range(0, max(repetitions, 1), chunk_size):
+        size = min(chunk_size, max(repetitions, 1) - i)
+        turtles = cycle_turtles_array(
+            tau_0, k, lam_c, size = (len(labren_ids), size), rng = rng,
+            exposures = (labels, labren_data), sigmoid = sigmoid, 
+            record = rows
+            )
+        stats = update_turtles_stats(stats, turtles)
+    
+    return summarize_sweep_chunk(
+        labren_ids, stats.mean, [steps[i] for i in rows]
+        )
+
+def summarize_sweep_chunk(labren_ids, turtles, steps):
+    """Compute summary statistics of each station and model step.
+    
+    ``turtles`` is a ``(steps, stations, n)`` array of ``tau`` values and 
+    ``steps`` holds the ``(cycle, label)`` pair of each step.
+    """
+    data = load_labren_data()[[get_labren_index(i) for i in labren_ids]]
+    out = summarize_turtles(turtles, steps)
+    
+    out.insert(0, "id", np.repeat(labren_ids, len(turtles)))
+    out.insert(1, "lon", np.repeat(data["lon"], len(turtles)))
+    out.insert(2, "lat", np.repeat(data["lat"], len(turtles)))
+    
+    return out
+
+def summarize_turtles(turtles, steps):
+    """Compute summary statistics of the ``tau`` values of each model step.
+    
+    ``turtles`` is a ``(steps, runs, n)`` (or ``(steps, n)``) array of ``tau``
+    values and ``steps`` holds the ``(cycle, label)`` pair of each step. The 
+    result has one row for each run and step, grouped by run.
+    """
+    out = []
+    
+    for i, (cycle, label) in enumerate(steps):
+        tau_i = np.atleast_2d(turtles[i])
+        quantiles = np.quantile(tau_i, [0, 0.25, 0.5, 0.75, 1], axis = 1)
+        
+        out.append(pd.DataFrame({
+            "cycle": cycle, "exposure": label, 
+            "mean": np.mean(tau_i, axis = 1),
+            "var": np.var(tau_i, axis = 1), "std": np.std(tau_i, axis = 1), 
+            "min": quantiles[0], "q_1": quantiles[1], "median": quantiles[2], 
+            "q_3": quantiles[3], "max": quantiles[4]
+            }))
+    
+    ## Group rows by run, keeping the exposure order
+    order = np.arange(len(out) * len(out[0]))
+    order = order.reshape(len(out), len(out[0])).T.ravel()
+    out = pd.concat(out, ignore_index = True).iloc[order]
+    
+    return out.reset_index(drop = True)
+
+def store_sweep_chunk(out, chunk, i, path = None):
+    """Keep the ``i``-th station chunk in ``out`` or append it to ``path``."""
+    if path == None:
+        out.append(chunk)
+    else:
+        chunk.to_csv(
+            path, mode = "a" if i > 0 else "w", header = i == 0, index = False
+            )
+    
+    return None
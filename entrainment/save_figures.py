@@ -0,0 +1,78 @@
+from concurrent.futures import as_completed
+from alive_progress import alive_bar
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from .utils import get_executor
+
+def save_figures(
+    plot, args, paths, workers = None, chunk_size = 10, dpi = None,
+    show_progress = True, **kwargs
+    ):
+    """Draw and save many figures without displaying them.
+    
+    ``plot`` is one of the ``plot_*`` functions (e.g., ``plot_model_line``).
+    Each figure is drawn with ``plot(*args[i], fig = fig, show = False,
+    **kwargs)`` and saved to ``paths[i]``, in the format given by its
+    extension (e.g., ``.png``, ``.svg`` or ``.pdf``). An item of ``args`` that
+    is not a ``tuple`` (e.g., a model) is passed as the only argument.
+    
+    The figures are drawn with the Agg backend, outside ``pyplot``, so
+    nothing is displayed or left open. The figures are saved
+    ``chunk_size`` at a time, reusing a single figure for each chunk. Set
+    ``workers`` to spread the chunks across a process pool.
+    
+    :Example:
+    
+    >>> models = [
+        entrainment.run_model(lam_c = i, plot = False)
+        for i in [3000, 3750, 4500]
+        ]
+    >>> entrainment.save_figures(
+        entrainment.plot_model_line, models,
+        ["lam_c_3000.png", "lam_c_3750.png", "lam_c_4500.png"], workers = 3
+        )
+    """
+    args = [i if isinstance(i, tuple) else (i,) for i in args]
+    paths = list(paths)
+    
+    if not len(args) == len(paths):
+        raise ValueError("'args' and 'paths' must have the same length.")
+    
+    chunks = [
+        (plot, args[i:(i + chunk_size)], paths[i:(i + chunk_size)], dpi, kwargs)
+        for i in range(0, len(args), chunk_size)
+        ]
+    
+    with alive_bar(
+        len(paths), title = "- Saving figures", force_tty = True,
+        length = 10, disable = not show_progress
+        ) as bar:
+        if workers == None:
+            for i in chunks:
+                save_figures_chunk(*i)
+                bar(len(i[2]))
+        else:
+            with get_executor(workers) as executor:
+                futures = {
+                    executor.submit(save_figures_chunk, *i): len(i[2])
+                    for i in chunks
+                    }
+                
+                for future in as_completed(futures):
+                    future.result()
+                    bar(futures[future])
+    
+    return paths
+
+def save_figures_chunk(plot, args, paths, dpi = None, kwargs = None):
+    """Draw and save a chunk of figures, reusing a single Agg figure."""
+    if kwargs == None: kwargs = {}
+    
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    
+    for i, path in zip(args, paths):
+        plot(*i, fig = fig, show = False, **kwargs)
+        fig.savefig(path, dpi = dpi)
+    
+    return None
@@ -1,8 +1,12 @@
+import itertools
 import numpy as np
 import matplotlib.pyplot as plt
+import pandas as pd
 import seaborn as sns
 from scipy import stats
-from .analyze_model import analyze_model
+from statsmodels.stats.multitest import multipletests
+from .analyze_model import analyze_model, analyze_model_batch
+from .utils import get_figure, show_figure
 from box import Box
 from collections import namedtuple
 
@@ -19,8 +23,8 @@ def test_hypothesis(
     x_stats = analyze_model(x, exposure, print_stats = False, plot = False)
     y_stats = analyze_model(y, exposure, print_stats = False, plot = False)
     
-    x_tau = [i["tau"] for i in np.array(x.turtles[exposure])]
-    y_tau = [i["tau"] for i in np.array(y.turtles[exposure])]
+    x_tau = x.tau(exposure)
+    y_tau = y.tau(exposure)
     
     std_t_test = stats.ttest_ind(
         x_tau, y_tau, equal_var = True, alternative = alternative
@@ -57,6 +61,132 @@ def test_hypothesis(
     
     return out
 
+def test_hypothesis_batch(
+    models, exposures = None, alternative = "less", names = None,
+    correction = "holm", alpha = 0.05
+    ):
+    """Compute the tests of ``test_hypothesis()`` for many pairs of models.
+    
+    ``models`` is a ``list`` of models (or a ``dict`` mapping names to 
+    models). Every pair of models is compared on every exposure in 
+    ``exposures`` (default: all exposures of the first model), with the first
+    model of the pair as ``x``. At least two models are needed. A single 
+    exposure (e.g., ``"summer"``) can be given without a ``list``.
+    
+    Student's and Welch's t tests, variance ratios and Cohen's :math:`d` are 
+    computed in vectorized form from the means and variances cached by 
+    ``analyze_model_batch()``. The coefficients of determination 
+    (:math:`R^2`) of all pairs of an exposure come from a single correlation 
+    matrix. As in ``test_hypothesis()``, the Student's t test is used when 
+    the variance ratio is below 2, and the Welch's t test otherwise 
+    (``p_value``). These p-values are then adjusted for multiple comparisons
+    with ``statsmodels.stats.multitest.multipletests()``, using the 
+    ``correction`` method (e.g., ``"holm"``, ``"bonferroni"``, 
+    ``"fdr_bh"``) and ``alpha``.
+    
+    Returns a tidy ``pandas.DataFrame`` with one row for each exposure and 
+    pair of models.
+    
+    :Example:
+    
+    >>> models = {
+        i: entrainment.run_model(lam_c = i, plot = False) 
+        for i in [3000, 3750, 4500]
+        }
+    >>> entrainment.test_hypothesis_batch(models, exposures = ["summer"])
+    """
+    if isinstance(models, dict):
+        names, models = list(models), list(models.values())
+    else:
+        models = list(models)
+        if names == None: names = list(range(len(models)))
+    
+    if len(models) < 2:
+        raise ValueError("'models' must have at least two models.")
+    
+    if exposures is None:
+        exposures = models[0].exposures
+    elif isinstance(exposures, str) or (
+        isinstance(exposures, tuple) and len(exposures) == 2 and 
+        isinstance(exposures[1], str)
+        ):
+        exposures = [exposures]
+    
+    if not alternative in ["less", "greater", "two-sided"]:
+        raise ValueError(
+            "'alternative' must be \"less\", \"greater\" or " +
+            "\"two-sided\"."
+            )
+    
+    x, y = np.array(list(itertools.combinations(range(len(models)), 2))).T
+    n = np.array([len(i.k) for i in models])
+    x_n, y_n = n[x], n[y]
+    df = x_n + y_n - 2
+    out = []
+    
+    for exposure in exposures:
+        rows = [
+            analyze_model_batch(i).iloc[i.index(exposure)] for i in models
+            ]
+        mean = np.array([i["mean"] for i in rows])
+        var = np.array([i["var"] for i in rows])
+        
+        ## Unbiased variances, as used by ``stats.ttest_ind()``
+        s_2 = var * n / (n - 1)
+        x_se, y_se = s_2[x] / x_n, s_2[y] / y_n
+        
+        pooled = ((x_n - 1) * s_2[x] + (y_n - 1) * s_2[y]) / df
+        std_t_stat = (mean[x] - mean[y]) / \
+            np.sqrt(pooled * (1 / x_n + 1 / y_n))
+        welch_t_stat = (mean[x] - mean[y]) / np.sqrt(x_se + y_se)
+        welch_df = (x_se + y_se)**2 / \
+            (x_se**2 / (x_n - 1) + y_se**2 / (y_n - 1))
+        
+        var_ratio = np.maximum(var[x], var[y]) / np.minimum(var[x], var[y])
+        ratio_test = var_ratio < 2
+        t = np.where(ratio_test, std_t_stat, welch_t_stat)
+        
+        ## Pearson's correlations between all models (``stats.linregress()``
+        ## pairs the turtles/subjects, so all models must have the same size)
+        r_squared = np.corrcoef(np.array([i.tau(exposure) for i in models]))
+        r_squared = r_squared[x, y]**2
+        
+        out.append(pd.DataFrame({
+            "exposure": [exposure] * len(x), "x": [names[i] for i in x],
+            "y": [names[i] for i in y], "x_mean": mean[x], "y_mean": mean[y],
+            "x_var": var[x], "y_var": var[y], "var_ratio": var_ratio,
+            "std_t_stat": std_t_stat,
+            "std_t_pvalue": t_test_pvalue(std_t_stat, df, alternative),
+            "welch_t_stat": welch_t_stat,
+            "welch_t_pvalue": t_test_pvalue(
+                welch_t_stat, welch_df, alternative
+                ),
+            "test": np.where(ratio_test, "student", "welch"),
+            "cohens_d": np.abs(
+                (t * (x_n + y_n)) / (np.sqrt(df) * np.sqrt(x_n * y_n))
+                ),
+            "r_squared": r_squared
+            }))
+    
+    out = pd.concat(out, ignore_index = True)
+    out["p_value"] = np.where(
+        out["test"] == "student", out["std_t_pvalue"], out["welch_t_pvalue"]
+        )
+    out["reject"], out["p_adjusted"] = multipletests(
+        out["p_value"], alpha = alpha, method = correction
+        )[:2]
+    
+    return out
+
+def t_test_pvalue(t, df, alternative = "less"):
+    """Compute the p-values of t statistics, as ``stats.ttest_ind()`` does."""
+    if alternative == "less":
+        return stats.t.cdf(t, df)
+    elif alternative == "greater":
+        return stats.t.sf(t, df)
+    else:
+        return 2 * stats.t.sf(np.abs(t), df)
+
 def cohens_d(x, y, t = None, abs = True):
     """Compute Cohen's :math:`d`.
     
@@ -149,10 +279,16 @@ def print_hypothesis_test(exposure, test_stats, x_name = None, y_name = None):
     
     return None
 
-def plot_hypothesis_test(x, y, exposure, test_stats, x_name = "X", y_name = "Y"):
-    """Plot results of 'test_hypothesis()'."""
-    x_tau = [i["tau"] for i in np.array(x.turtles[exposure])]
-    y_tau = [i["tau"] for i in np.array(y.turtles[exposure])]
+def plot_hypothesis_test(
+    x, y, exposure, test_stats, x_name = "X", y_name = "Y", ax = None, 
+    fig = None, show = True
+    ):
+    """Plot results of 'test_hypothesis()'.
+    
+    See ``plot_model_line()`` for ``ax``, ``fig`` and ``show``.
+    """
+    x_tau = x.tau(exposure)
+    y_tau = y.tau(exposure)
     settings = x.settings
 
     title = ("Exposure = {exposure}, N = ${n}$, $\\lambda_c = {lam_c}$, " +\
@@ -167,24 +303,24 @@ def plot_hypothesis_test(x, y, exposure, test_stats, x_name = "X", y_name = "Y")
                  )
     
     plt.rcParams.update({'font.size': 10})
-    plt.clf()
     
-    fig, ax = plt.subplots()
-    sns.kdeplot(x_tau, color = "red", label = x_name, linewidth = 1, 
-            warn_singular = False)
-    sns.kdeplot(y_tau, color = "blue", label = y_name, linewidth = 1, 
+    adjust = ax is None
+    fig, ax = get_figure(fig, ax)
+    sns.kdeplot(x_tau, ax = ax, color = "red", label = x_name, linewidth = 1, 
+                warn_singular = False)
+    sns.kdeplot(y_tau, ax = ax, color = "blue", label = y_name, linewidth = 1, 
                 warn_singular = False)
     ax.set_xlabel("$\\tau$")
     ax.set_ylabel("Kernel Density Estimate (KDE)")
     ax.set_xlim(23.5, 24.6)
     ax.set_title(title, fontsize = 8)
     
-    plt.legend(fontsize = 8)
+    ax.legend(fontsize = 8)
     # 0.0625 | 0.125 | 0.25 | 0.5 | 1
-    plt.subplots_adjust(
-        left = 0.11875, bottom = 0.16875, right = 0.93125, top = 0.8875, 
-        wspace = None, hspace = None
-        )
-    plt.show()
+    if adjust == True:
+        fig.subplots_adjust(
+            left = 0.11875, bottom = 0.16875, right = 0.93125, top = 0.8875, 
+            wspace = None, hspace = None
+            )
     
-    return None
+    return show_figure(fig, show)
@@ -1,4 +1,8 @@
+import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 def cli_progress_step(msg, show_progress = True):
     if show_progress == True:
@@ -6,6 +10,77 @@ def cli_progress_step(msg, show_progress = True):
     
     return None
 
+def get_executor(workers = None):
+    """Create a pool of ``workers`` processes.
+    
+    The processes are spawned (not forked), so they never inherit the threads
+    of the parent (e.g., of the Numba threading layer, which can hang a forked
+    process). Each process runs Numba kernels on a single thread, since the
+    pool already uses the cores. Scripts that use ``workers`` must guard 
+    their entry point with ``if __name__ == "__main__":``.
+    """
+    return ProcessPoolExecutor(
+        max_workers = workers, mp_context = multiprocessing.get_context("spawn"),
+        initializer = init_worker
+        )
+
+def init_worker():
+    """Limit the Numba threads of a pool process to one."""
+    os.environ["NUMBA_NUM_THREADS"] = "1"
+    
+    return None
+
+def get_figure(fig = None, ax = None, nrows = 1, ncols = 1):
+    """Get the figure and axes of a plot.
+    
+    If ``ax`` is given (an axes, or one for each subplot), the plot is drawn
+    on it. Otherwise, the axes are created on ``fig`` (cleared first, so it 
+    can be reused) or on a new ``pyplot`` figure.
+    """
+    if not ax is None:
+        fig = np.ravel(ax)[0].get_figure()
+    elif fig is None:
+        fig, ax = plt.subplots(nrows = nrows, ncols = ncols)
+    else:
+        fig.clear()
+        ax = fig.subplots(nrows = nrows, ncols = ncols)
+    
+    return fig, ax
+
+def show_figure(fig, show = True):
+    """Show a figure (if ``show == True``) and return it."""
+    if show == True: plt.show()
+    
+    return fig
+
+def get_rng(seed = None, bit_generator = "PCG64"):
+    """Create a NumPy random generator.
+    
+    ``seed`` can be anything accepted by ``np.random.SeedSequence`` (including 
+    a ``SeedSequence``). ``bit_generator`` is the name of a NumPy bit generator 
+    (e.g., ``"PCG64"``, ``"PCG64DXSM"``, ``"Philox"``, ``"SFC64"``).
+    
+    :Example:
+    
+    >>> get_rng(1, "Philox").uniform()
+    """
+    return np.random.Generator(getattr(np.random, bit_generator)(seed))
+
+def get_seed_sequence(seed = None):
+    """Convert a seed to a ``np.random.SeedSequence``.
+    
+    A ``SeedSequence`` is copied (without its spawned children), so spawning
+    from the result never changes the caller's sequence and the same seed 
+    always gives the same children.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return np.random.SeedSequence(
+            seed.entropy, spawn_key = seed.spawn_key, 
+            pool_size = seed.pool_size
+            )
+    else:
+        return np.random.SeedSequence(seed)
+
 def reorder(x, start_at = 0):
     """Reorder a list or array by a starting point.
     